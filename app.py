@@ -3,6 +3,7 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from recommender import AnimeRecommender
+from response_cache import SQLiteCache
 
 # Page config
 st.set_page_config(
@@ -15,7 +16,12 @@ st.set_page_config(
 # Initialize recommender
 @st.cache_resource
 def load_recommender():
-    return AnimeRecommender('anime.csv')
+    return AnimeRecommender(
+        'anime.csv',
+        artifact_dir='model_artifact',
+        response_cache=SQLiteCache('gemini_cache.sqlite'),
+        compact=True
+    )
 
 recommender = load_recommender()
 
@@ -172,15 +178,13 @@ st.markdown("<p style='text-align: center; font-size: 1.1em; color: rgba(255,255
 
 # Stats
 col1, col2, col3, col4 = st.columns(4)
-all_genres = set()
-for genres in recommender.df['genres'].dropna():
-    all_genres.update([g.strip() for g in genres.split(',')])
+stats = recommender.stats
 
 with col1:
     st.markdown(f"""
         <div class='stat-card'>
             <div style='font-size: 2.5em; margin-bottom: 0.5rem;'>📚</div>
-            <div style='font-size: 2em; font-weight: 700; margin-bottom: 0.25rem;'>{len(recommender.df):,}</div>
+            <div style='font-size: 2em; font-weight: 700; margin-bottom: 0.25rem;'>{stats.count:,}</div>
             <div style='font-size: 0.9em; opacity: 0.8;'>Anime</div>
         </div>
     """, unsafe_allow_html=True)
@@ -188,7 +192,7 @@ with col2:
     st.markdown(f"""
         <div class='stat-card'>
             <div style='font-size: 2.5em; margin-bottom: 0.5rem;'>⭐</div>
-            <div style='font-size: 2em; font-weight: 700; margin-bottom: 0.25rem;'>{recommender.df['score'].mean():.1f}</div>
+            <div style='font-size: 2em; font-weight: 700; margin-bottom: 0.25rem;'>{stats.score_mean:.1f}</div>
             <div style='font-size: 0.9em; opacity: 0.8;'>Avg Score</div>
         </div>
     """, unsafe_allow_html=True)
@@ -196,7 +200,7 @@ with col3:
     st.markdown(f"""
         <div class='stat-card'>
             <div style='font-size: 2.5em; margin-bottom: 0.5rem;'>🎭</div>
-            <div style='font-size: 2em; font-weight: 700; margin-bottom: 0.25rem;'>{len(all_genres)}</div>
+            <div style='font-size: 2em; font-weight: 700; margin-bottom: 0.25rem;'>{len(stats.genre_counts)}</div>
             <div style='font-size: 0.9em; opacity: 0.8;'>Genres</div>
         </div>
     """, unsafe_allow_html=True)
@@ -204,7 +208,7 @@ with col4:
     st.markdown(f"""
         <div class='stat-card'>
             <div style='font-size: 2.5em; margin-bottom: 0.5rem;'>📺</div>
-            <div style='font-size: 2em; font-weight: 700; margin-bottom: 0.25rem;'>{int(recommender.df['episodes'].sum()):,}</div>
+            <div style='font-size: 2em; font-weight: 700; margin-bottom: 0.25rem;'>{stats.episodes_total:,}</div>
             <div style='font-size: 0.9em; opacity: 0.8;'>Episodes</div>
         </div>
     """, unsafe_allow_html=True)
@@ -241,7 +245,7 @@ with tab1:
     # Button to trigger search
     if st.button("Get Recommendations", type="primary", width='stretch', key="rec_btn"):
         if anime_search:
-            search_results = recommender.search_anime(anime_search)
+            search_results = recommender.search_anime(anime_search, limit=1)
             
             if len(search_results) > 0:
                 selected_anime = search_results.iloc[0]['name']
@@ -288,10 +292,10 @@ with tab1:
     
     # Show suggestions
     elif anime_search and len(anime_search) >= 2:
-        search_results = recommender.search_anime(anime_search)
+        search_results = recommender.search_anime(anime_search, limit=6)
         if len(search_results) > 0:
             st.markdown("**Quick suggestions:**")
-            suggestions = search_results['name'].head(6).tolist()
+            suggestions = search_results['name'].tolist()
             st.caption(", ".join(suggestions))
 
 with tab2:
@@ -317,7 +321,7 @@ with tab2:
     # Button to trigger AI search
     if st.button("Get AI Recommendations", type="primary", width='stretch', key="ai_btn"):
         if ai_search:
-            search_results = recommender.search_anime(ai_search)
+            search_results = recommender.search_anime(ai_search, limit=1)
             
             if len(search_results) > 0:
                 selected_anime = search_results.iloc[0]['name']
@@ -364,10 +368,10 @@ with tab2:
     
     # Show suggestions
     elif ai_search and len(ai_search) >= 2:
-        search_results = recommender.search_anime(ai_search)
+        search_results = recommender.search_anime(ai_search, limit=6)
         if len(search_results) > 0:
             st.markdown("**Quick suggestions:**")
-            suggestions = search_results['name'].head(6).tolist()
+            suggestions = search_results['name'].tolist()
             st.caption(", ".join(suggestions))
 
 with tab3:
@@ -378,10 +382,7 @@ with tab3:
     col1, col2, col3, col4 = st.columns(4)
     
     # Get unique genres
-    genre_set = set()
-    for genres in recommender.df['genres'].dropna():
-        genre_set.update([g.strip() for g in genres.split(',')])
-    genre_list = sorted(list(genre_set))
+    genre_list = stats.genres
     
     with col1:
         search_term = st.text_input("Search", placeholder="Name or genre...", label_visibility="collapsed")
@@ -392,43 +393,59 @@ with tab3:
     with col4:
         sort_by = st.selectbox("Sort by", ["score", "members", "name"], label_visibility="collapsed")
     
-    # Apply filters
-    filtered_df = recommender.df.copy()
-    
+    # Apply filters (no filter pages straight through the precomputed sort order)
+    positions = None
     if search_term:
-        filtered_df = recommender.search_anime(search_term)
-    if selected_genre != "All":
-        filtered_df = filtered_df[filtered_df['genres'].str.contains(selected_genre, case=False, na=False)]
-    if anime_type != "All":
-        filtered_df = filtered_df[filtered_df['type'] == anime_type]
-    
-    # Sort
-    if sort_by == "name":
-        filtered_df = filtered_df.sort_values(sort_by, ascending=True)
-    else:
-        filtered_df = filtered_df.sort_values(sort_by, ascending=False)
-    
-    st.markdown(f"**{len(filtered_df)}** anime found")
+        positions = recommender.search_positions(search_term)
+    if selected_genre != "All" or anime_type != "All":
+        positions = recommender.query_anime(
+            genres=selected_genre if selected_genre != "All" else None,
+            types=anime_type if anime_type != "All" else None,
+            positions=positions
+        )
+    total = len(recommender.df) if positions is None else len(positions)
+    
+    st.markdown(f"**{total}** anime found")
+    
+    # Only the current page is sorted into view and materialized
+    page_size = 100
+    page_count = max((total + page_size - 1) // page_size, 1)
+    page = 1
+    if page_count > 1:
+        page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, step=1)
+    page_rows, _ = recommender.get_page(
+        positions, sort_by, offset=(page - 1) * page_size, limit=page_size,
+        columns=['name', 'score', 'genres', 'type', 'episodes', 'members']
+    )
     
     # Display
     st.dataframe(
-        filtered_df[['name', 'score', 'genres', 'type', 'episodes', 'members']].head(100),
+        page_rows,
         width='stretch',
         height=500
     )
     
-    if len(filtered_df) > 100:
-        st.info(f"Showing first 100 of {len(filtered_df)} results")
-    
-    # Download
-    csv = filtered_df.to_csv(index=False)
-    st.download_button(
-        "Download CSV",
-        data=csv,
-        file_name="anime_results.csv",
-        mime="text/csv",
-        width='stretch'
-    )
+    if page_count > 1:
+        first = (page - 1) * page_size + 1
+        st.info(f"Showing {first}-{first + len(page_rows) - 1} of {total} results")
+    
+    # Download: the CSV is only generated once the user asks for it
+    export_key = (search_term, selected_genre, anime_type, sort_by)
+    if st.session_state.get('browse_export_key') != export_key:
+        st.session_state.browse_export_key = export_key
+        st.session_state.browse_csv = None
+    if st.session_state.browse_csv is None:
+        if st.button("Prepare CSV download", width='stretch'):
+            st.session_state.browse_csv = "".join(recommender.iter_csv(positions, sort_by))
+            st.rerun()
+    else:
+        st.download_button(
+            "Download CSV",
+            data=st.session_state.browse_csv,
+            file_name="anime_results.csv",
+            mime="text/csv",
+            width='stretch'
+        )
 
 with tab4:
     st.markdown("### Database statistics and visualizations")
@@ -438,13 +455,7 @@ with tab4:
     
     with col1:
         # Genre distribution
-        genre_counts = {}
-        for genres in recommender.df['genres'].dropna():
-            for genre in genres.split(','):
-                genre = genre.strip()
-                genre_counts[genre] = genre_counts.get(genre, 0) + 1
-        
-        genre_df = pd.DataFrame(list(genre_counts.items()), columns=['Genre', 'Count'])
+        genre_df = pd.DataFrame(list(stats.genre_counts.items()), columns=['Genre', 'Count'])
         genre_df = genre_df.sort_values('Count', ascending=False).head(12)
         
         fig1 = px.bar(
@@ -465,11 +476,9 @@ with tab4:
     
     with col2:
         # Type distribution
-        type_counts = recommender.df['type'].value_counts()
-        
         fig2 = px.pie(
-            values=type_counts.values, 
-            names=type_counts.index,
+            values=list(stats.type_counts.values()), 
+            names=list(stats.type_counts.keys()),
             hole=0.5,
             color_discrete_sequence=px.colors.sequential.Purples_r
         )
@@ -481,12 +490,13 @@ with tab4:
         st.plotly_chart(fig2, width='stretch')
     
     # Score distribution
-    fig3 = px.histogram(
-        recommender.df, 
-        x='score', 
-        nbins=25,
-        color_discrete_sequence=['#667eea']
-    )
+    edges = stats.score_hist_edges
+    fig3 = go.Figure(go.Bar(
+        x=[(lo + hi) / 2 for lo, hi in zip(edges[:-1], edges[1:])],
+        y=stats.score_hist_counts,
+        width=[hi - lo for lo, hi in zip(edges[:-1], edges[1:])],
+        marker_color='#667eea'
+    ))
     fig3.update_layout(
         title="Score Distribution",
         xaxis_title="Score",
@@ -499,8 +509,18 @@ with tab4:
     
     # Top rated
     st.markdown("#### Top Rated Anime")
-    top_n = st.slider("Number of anime", 5, 30, 10, label_visibility="collapsed")
-    top_anime = recommender.get_top_anime(top_n)
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        top_n = st.slider("Number of anime", 5, 30, 10, label_visibility="collapsed")
+    with col2:
+        top_genre = st.selectbox("Top genre", ["All"] + genre_list, label_visibility="collapsed")
+    with col3:
+        top_type = st.selectbox("Top type", ["All", "TV", "Movie", "OVA", "Special", "ONA"], label_visibility="collapsed")
+    top_anime = recommender.get_top_anime(
+        top_n,
+        genre=top_genre if top_genre != "All" else None,
+        anime_type=top_type if top_type != "All" else None
+    )
     st.dataframe(top_anime, width='stretch', height=350)
 
 # Footer
@@ -0,0 +1,71 @@
+"""
+Compare two benchmarks.suite result files
+
+Flags every timing (build, and p50/p99 of each operation) that got slower
+than the baseline by more than the threshold, and exits with code 1 if
+any did, so it can gate a CI job.
+
+Usage:
+    python -m benchmarks.compare baseline.json current.json [--threshold 0.10]
+"""
+import argparse
+import json
+import sys
+
+
+def metrics(result):
+    """Flatten one catalog size's result to {metric name: seconds or ms} (lower is better)"""
+    flat = {'build_s': result['build_s']}
+    for name, op in result['ops'].items():
+        flat[f'{name}.p50_ms'] = op['p50_ms']
+        flat[f'{name}.p99_ms'] = op['p99_ms']
+    if result.get('peak_rss_mb') is not None:
+        flat['peak_rss_mb'] = result['peak_rss_mb']
+    return flat
+
+
+def compare(baseline, current, threshold):
+    """Return (rows of (size, metric, base, new, change), regressions)"""
+    rows, regressions = [], []
+    for size, result in current['results'].items():
+        if size not in baseline['results']:
+            continue
+        base = metrics(baseline['results'][size])
+        for name, value in metrics(result).items():
+            if name not in base or not base[name]:
+                continue
+            change = value / base[name] - 1
+            row = (size, name, base[name], value, change)
+            rows.append(row)
+            if change > threshold:
+                regressions.append(row)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Allowed slowdown, e.g. 0.10 = 10%%')
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, encoding='utf-8') as f:
+        current = json.load(f)
+
+    print(f"Comparing {baseline['meta'].get('commit')} -> {current['meta'].get('commit')}"
+          f" (threshold {args.threshold:.0%})")
+    rows, regressions = compare(baseline, current, args.threshold)
+    for size, name, base, value, change in rows:
+        marker = '❌' if change > args.threshold else ('✅' if change < -args.threshold else '  ')
+        print(f"{marker} {size:>7} {name:<32} {base:>10.3f} -> {value:>10.3f}  {change:+7.1%}")
+
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) over {args.threshold:.0%}")
+        sys.exit(1)
+    print("✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Import-time budget check for recommender.py
+
+Runs `python -X importtime -c "import recommender"` in a fresh interpreter,
+reports the cumulative import time and the slowest dependencies, and fails
+(exit code 1) when the import exceeds the budget or pulls in a backend that
+must only load on first use.
+
+numpy and pandas load on every path and cannot be deferred, so the budget
+applies to the import time on top of a baseline `import numpy, pandas` run.
+Each run is repeated and the fastest kept, to damp scheduler noise.
+
+Usage:
+    python -m benchmarks.importtime [--budget-ms 600] [--module recommender] [--repeat 3]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Backends that must not be imported just by importing the module
+DEFERRED_MODULES = ('sklearn', 'streamlit', 'google.generativeai')
+
+# Imported by every entry point; their cost is subtracted before the budget check
+BASELINE_MODULES = ('numpy', 'pandas')
+
+
+def measure(module):
+    """Return ({imported module: cumulative microseconds}, set of top-level packages imported)"""
+    code = f"import sys, {module}; print(' '.join(sorted(sys.modules)))"
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith('import time:')]
+        sys.exit(f"❌ import {module} failed:\n" + '\n'.join(errors[-5:]))
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        timings[name.strip()] = int(cumulative)
+    return timings, set(result.stdout.split())
+
+
+def fastest(module, repeat):
+    """measure() repeated, keeping each module's fastest cumulative time"""
+    timings, modules = measure(module)
+    for _ in range(repeat - 1):
+        again, _ = measure(module)
+        timings = {name: min(us, again.get(name, us)) for name, us in timings.items()}
+    return timings, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='recommender')
+    parser.add_argument('--budget-ms', type=float, default=600, help='Budget on top of the numpy/pandas baseline')
+    parser.add_argument('--top', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    baseline, _ = fastest(', '.join(BASELINE_MODULES), args.repeat)
+    baseline_ms = sum(baseline[name] for name in BASELINE_MODULES) / 1000
+    timings, modules = fastest(args.module, args.repeat)
+    total_ms = timings[args.module] / 1000 - baseline_ms
+    print(f"⏱️ import {args.module}: {total_ms:.0f} ms over the {', '.join(BASELINE_MODULES)} baseline "
+          f"of {baseline_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    top_level = {name: us for name, us in timings.items() if '.' not in name and name != args.module}
+    for name, us in sorted(top_level.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {name:<28} {us / 1000:8.1f} ms")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"import took {total_ms:.0f} ms, over the {args.budget_ms:.0f} ms budget")
+    for name in DEFERRED_MODULES:
+        if name in modules:
+            failures.append(f"{name} is imported eagerly")
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ Import time within budget")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Load generator for server.py
+
+Fires requests from concurrent client threads for a fixed duration and
+reports throughput, latency percentiles and the share of 503 (queue full)
+and failed responses.
+
+Usage:
+    python server.py --port 8000 &
+    python -m benchmarks.loadgen [--url http://127.0.0.1:8000] [--concurrency 16] [--duration 10]
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def request_mix(data_path, seed=0):
+    """Build a list of (method, path, body) covering every endpoint, weighted towards recommendations"""
+    df = pd.read_csv(data_path, usecols=['anime_id', 'name'])
+    rng = random.Random(seed)
+    ids = df['anime_id'].tolist()
+    names = df['name'].tolist()
+    requests = []
+    for _ in range(200):
+        requests.append(('GET', f'/recommend?id={rng.choice(ids)}&n=10', None))
+        requests.append(('GET', f'/recommend?title={quote(rng.choice(names))}&n=10', None))
+    for _ in range(40):
+        batch = rng.sample(ids, 20)
+        requests.append(('POST', '/recommend/batch', json.dumps({'titles': batch, 'n': 10}).encode('utf-8')))
+        requests.append(('GET', f'/search?q={quote(rng.choice(names)[:4])}&limit=10', None))
+        requests.append(('GET', f'/filter?genre=Action&min_score={rng.choice([6, 7, 8])}&limit=20', None))
+        requests.append(('GET', '/top?n=10', None))
+    rng.shuffle(requests)
+    return requests
+
+
+def percentile(values, q):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(int(q / 100 * len(values)), len(values) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--data', default='anime.csv')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+
+    target = urlsplit(args.url)
+    mix = request_mix(args.data)
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+
+    def client(worker):
+        local_latencies, local_statuses = [], {}
+        i = worker
+        while time.perf_counter() < deadline:
+            method, path, body = mix[i % len(mix)]
+            i += args.concurrency
+            start = time.perf_counter()
+            try:
+                conn = http.client.HTTPConnection(target.hostname, target.port, timeout=30)
+                headers = {'Content-Type': 'application/json'} if body else {}
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+                conn.close()
+            except OSError:
+                status = 'error'
+            local_latencies.append((time.perf_counter() - start) * 1000)
+            local_statuses[status] = local_statuses.get(status, 0) + 1
+        with lock:
+            latencies.extend(local_latencies)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=client, args=(w,)) for w in range(args.concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    total = len(latencies)
+    print(f"📈 {total} requests in {elapsed:.1f}s with {args.concurrency} clients: {total / elapsed:.0f} req/s")
+    print(f"  latency p50 {percentile(latencies, 50):.1f} ms | p99 {percentile(latencies, 99):.1f} ms"
+          f" | mean {statistics.fmean(latencies) if latencies else float('nan'):.1f} ms")
+    print(f"  status counts: {dict(sorted(statuses.items(), key=str))}")
+
+
+if __name__ == "__main__":
+    main()
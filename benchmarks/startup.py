@@ -0,0 +1,94 @@
+"""
+Cold-start benchmark for the catalog loading paths
+
+Usage:
+    python -m benchmarks.startup [--data anime.csv] [--rows 50000] [--repeat 5]
+
+--rows replicates the catalog (with fresh anime_ids) up to that many rows so
+the differences between the paths are measurable.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import catalog_loader  # noqa: E402
+import model_store  # noqa: E402
+
+# Columns the compact recommender parses (text columns are streamed separately)
+PROJECTED = [c for c in catalog_loader.CSV_DTYPES if c not in model_store.TEXT_COLUMNS]
+
+
+def make_catalog(data_path, rows, directory):
+    """Write a copy of the catalog replicated to `rows` rows and return its path"""
+    df = pd.read_csv(data_path)
+    if rows and rows > len(df):
+        copies = -(-rows // len(df))
+        df = pd.concat([df] * copies, ignore_index=True).iloc[:rows]
+        df['anime_id'] = range(1, len(df) + 1)
+    path = os.path.join(directory, 'anime.csv')
+    df.to_csv(path, index=False)
+    return path
+
+
+def pyarrow_csv(path):
+    """The pyarrow CSV engine alone, without read_csv's fallback to the C engine"""
+    try:
+        header = catalog_loader.read_columns(path)
+        return pd.read_csv(path, usecols=[c for c in header if c in PROJECTED], engine='pyarrow')
+    except pd.errors.ParserError:
+        return None
+
+
+def time_call(fn, repeat):
+    """Median and best wall time of fn() in milliseconds"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default='anime.csv')
+    parser.add_argument('--rows', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='anime-bench-') as directory:
+        path = make_catalog(args.data, args.rows, directory)
+        cases = [
+            ('read_csv, all columns (baseline)', lambda: pd.read_csv(path)),
+            ('projected CSV, c engine', lambda: catalog_loader.read_csv(path, PROJECTED, engine='c')),
+        ]
+        if catalog_loader.has_pyarrow():
+            for fmt in catalog_loader.SIDECAR_FORMATS:
+                catalog_loader.build_sidecar(path, fmt)
+            cases += [
+                ('projected CSV, pyarrow engine', lambda: pyarrow_csv(path)),
+                ('projected parquet sidecar', lambda: catalog_loader.load_catalog(path, PROJECTED, 'parquet')),
+                ('projected feather sidecar', lambda: catalog_loader.load_catalog(path, PROJECTED, 'feather')),
+            ]
+        else:
+            print("pyarrow is not installed: skipping the pyarrow engine and sidecar paths")
+
+        rows = len(pd.read_csv(path, usecols=['anime_id']))
+        print(f"\n⏱️ Catalog load, {rows} rows, median of {args.repeat}")
+        for label, fn in cases:
+            if fn() is None:
+                print(f"  {label:<36} unsupported for this file (multi-line values)")
+                continue
+            median, best = time_call(fn, args.repeat)
+            print(f"  {label:<36} {median:9.1f} ms  (best {best:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
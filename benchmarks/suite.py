@@ -0,0 +1,166 @@
+"""
+Benchmark suite for AnimeRecommender's hot paths
+
+For each catalog size, a synthetic catalog is generated (and cached) and a
+fresh interpreter times the model build, get_recommendations, search_anime,
+filter_anime and get_top_anime. It reports p50/p99 latency, throughput and
+the peak RSS of that process. Results are written as JSON for
+benchmarks.compare.
+
+Usage:
+    python -m benchmarks.suite [--sizes 5000 50000 500000] [--output results.json]
+
+Catalogs above --ann-above rows are built with neighbor_backend='ann' (an
+exact build is quadratic).
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where unsupported"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return round(peak / (1 << 20 if sys.platform == 'darwin' else 1 << 10), 1)
+
+
+def time_op(fn, args_list):
+    """Latency percentiles (ms) and throughput (ops/s) of fn over a list of argument tuples"""
+    fn(*args_list[0])  # warm-up
+    latencies = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies = np.array(latencies)
+    return {
+        'count': len(latencies),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 4),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 4),
+        'mean_ms': round(float(latencies.mean()), 4),
+        'throughput': round(float(len(latencies) / (latencies.sum() / 1000)), 1),
+    }
+
+
+def run_size(csv_path, iterations, backend, seed=0):
+    """Benchmark one catalog in this process"""
+    from metrics import InMemoryMetrics, NullMetrics
+    from recommender import AnimeRecommender
+
+    # The constructor builds the model once; its build spans give build_s
+    metrics = InMemoryMetrics()
+    start = time.perf_counter()
+    recommender = AnimeRecommender(csv_path, neighbor_backend=backend, metrics=metrics)
+    init_s = time.perf_counter() - start
+    build_s = sum(
+        sum(seconds) for (name, _), seconds in metrics.timings.items() if name in ('vectorize', 'similarity_build')
+    )
+    # Time the operations without span overhead
+    recommender.metrics = NullMetrics()
+
+    rng = random.Random(seed)
+    names = recommender.df['name'].tolist()
+    genres = recommender.stats.genres
+    ops = {
+        'get_recommendations': time_op(
+            recommender.get_recommendations, [(rng.choice(names), 10) for _ in range(iterations)]
+        ),
+        'search_anime': time_op(
+            recommender.search_anime, [(rng.choice(names).split()[0][:4], 20) for _ in range(iterations)]
+        ),
+        'filter_anime': time_op(
+            recommender.filter_anime,
+            [(rng.choice(genres), rng.choice([0, 6, 7, 8]), rng.choice([None, 12, 26])) for _ in range(iterations)]
+        ),
+        'get_top_anime': time_op(recommender.get_top_anime, [(10,)] * iterations),
+    }
+    return {
+        'rows': len(recommender.df),
+        'backend': backend,
+        'init_s': round(init_s, 3),
+        'build_s': round(build_s, 3),
+        'ops': ops,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5000, 50000])
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--ann-above', type=int, default=100000)
+    parser.add_argument('--source', default=os.path.join(ROOT, 'anime.csv'))
+    parser.add_argument('--cache-dir', default=os.path.join(tempfile.gettempdir(), 'anime-bench'))
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--worker', nargs=2, metavar=('CSV', 'BACKEND'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        csv_path, backend = args.worker
+        print(json.dumps(run_size(csv_path, args.iterations, backend)))
+        return
+
+    from benchmarks.synthetic import write_catalog
+
+    os.makedirs(args.cache_dir, exist_ok=True)
+    results = {}
+    for rows in args.sizes:
+        csv_path = os.path.join(args.cache_dir, f'synthetic_{rows}.csv')
+        print(f"🧪 {rows} rows: generating catalog" if not os.path.exists(csv_path) else f"🧪 {rows} rows")
+        write_catalog(rows, csv_path, args.source)
+        backend = 'ann' if rows > args.ann_above else 'exact'
+        # A fresh process per size keeps peak RSS and caches independent
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.suite', '--iterations', str(args.iterations),
+             '--worker', csv_path, backend],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        results[str(rows)] = result
+        print(f"  build {result['build_s']:.2f}s | peak RSS {result['peak_rss_mb']} MB | backend {backend}")
+        for name, op in result['ops'].items():
+            print(f"  {name:<20} p50 {op['p50_ms']:8.3f} ms  p99 {op['p99_ms']:8.3f} ms  {op['throughput']:10.0f} ops/s")
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'iterations': args.iterations,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Synthetic catalogs shaped like anime.csv
+
+Genre combinations, types, scores, episode counts and members are resampled
+from the real catalog (with some extra genres mixed in so combinations are
+not just copies), and synopses reuse its word frequencies and length
+distribution. Rows are written in chunks, so 500k-row catalogs never need
+to be held in memory.
+
+Usage:
+    python -m benchmarks.synthetic 50000 synthetic_50k.csv
+"""
+import os
+import sys
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 10000
+
+
+class CatalogModel:
+    """Empirical distributions of the real catalog's columns"""
+
+    def __init__(self, source='anime.csv'):
+        df = pd.read_csv(source).dropna(subset=['name', 'genres'])
+        self.genre_combos = df['genres'].to_numpy(dtype=object)
+        genre_counts = Counter(g.strip() for combo in self.genre_combos for g in combo.split(','))
+        self.genres = np.array(sorted(genre_counts), dtype=object)
+        frequency = np.array([genre_counts[g] for g in self.genres], dtype=np.float64)
+        self.genre_p = frequency / frequency.sum()
+        self.types = df['type'].fillna('TV').to_numpy(dtype=object)
+        self.scores = pd.to_numeric(df['score'], errors='coerce').fillna(0).to_numpy()
+        self.episodes = pd.to_numeric(df['episodes'], errors='coerce').to_numpy()
+        self.members = pd.to_numeric(df['members'], errors='coerce').fillna(0).to_numpy()
+
+        words = Counter(w for text in df['synopsis'].dropna() for w in text.split())
+        self.words = np.array(list(words), dtype=object)
+        counts = np.array(list(words.values()), dtype=np.float64)
+        self.word_p = counts / counts.sum()
+        self.synopsis_lengths = df['synopsis'].dropna().str.split().str.len().to_numpy()
+        title_words = Counter(w for name in df['name'] for w in str(name).split())
+        self.title_words = np.array(list(title_words), dtype=object)
+
+    def sample(self, start, rows, rng):
+        """DataFrame of `rows` synthetic anime with ids starting at start + 1"""
+        ids = np.arange(start + 1, start + rows + 1)
+        genres = []
+        extra = rng.choice(self.genres, rows, p=self.genre_p)
+        add_extra = rng.random(rows) < 0.3
+        for combo, genre, add in zip(rng.choice(self.genre_combos, rows), extra, add_extra):
+            parts = [g.strip() for g in combo.split(',')]
+            if add and genre not in parts:
+                parts.append(genre)
+            genres.append(', '.join(sorted(parts)))
+
+        lengths = rng.choice(self.synopsis_lengths, rows)
+        tokens = rng.choice(self.words, int(lengths.sum()), p=self.word_p)
+        bounds = np.concatenate([[0], np.cumsum(lengths)])
+        synopses = [' '.join(tokens[bounds[i]:bounds[i + 1]]) for i in range(rows)]
+
+        title_tokens = rng.choice(self.title_words, (rows, 2))
+        names = [f'{a} {b} {i}' for (a, b), i in zip(title_tokens, ids)]
+
+        scores = np.clip(rng.choice(self.scores, rows) + rng.normal(0, 0.2, rows), 1, 10).round(2)
+        scores[rng.random(rows) < 0.02] = np.nan
+        members = (rng.choice(self.members, rows) * rng.lognormal(0, 0.5, rows)).astype(np.int64)
+        return pd.DataFrame({
+            'anime_id': ids,
+            'name': names,
+            'score': scores,
+            'genres': genres,
+            'type': rng.choice(self.types, rows),
+            'episodes': rng.choice(self.episodes, rows),
+            'members': members,
+            'synopsis': synopses,
+            'image_url': [f'https://cdn.example.com/images/anime/{i}.jpg' for i in ids],
+        })
+
+
+def write_catalog(rows, path, source='anime.csv', seed=0):
+    """Write a synthetic catalog of `rows` rows to path (reused if it already exists)"""
+    if os.path.exists(path):
+        return path
+    model = CatalogModel(source)
+    rng = np.random.default_rng(seed)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        for start in range(0, rows, CHUNK_ROWS):
+            chunk = model.sample(start, min(CHUNK_ROWS, rows - start), rng)
+            chunk.to_csv(f, index=False, header=(start == 0))
+    os.replace(tmp_path, path)
+    return path
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    path = sys.argv[2] if len(sys.argv) > 2 else f'synthetic_{rows}.csv'
+    write_catalog(rows, path)
+    print(f"🧪 Wrote {rows} synthetic anime to {path}")
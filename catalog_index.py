@@ -0,0 +1,743 @@
+import bisect
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+# Optional columns holding other titles for the same anime
+ALT_TITLE_COLUMNS = ('title_english', 'title_japanese', 'title_synonyms')
+ALT_TITLE_SEPARATOR = '|'
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_name(text):
+    """Normalize a title for lookup: Unicode NFKC, casefold and collapsed whitespace"""
+    text = unicodedata.normalize('NFKC', str(text)).casefold()
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def build_name_index(df, names=None):
+    """
+    Map normalized titles to row positions
+
+    Primary names win over alternative titles, and when several rows share a
+    title the one with the most members wins (ties go to the earlier row).
+    names optionally gives the already normalized primary names.
+    """
+    if 'members' in df:
+        members = pd.to_numeric(df['members'], errors='coerce').fillna(0).to_numpy()
+    else:
+        members = np.zeros(len(df))
+    order = np.argsort(-members, kind='stable')
+
+    index = {}
+    if names is None:
+        names = [normalize_name(name) for name in df['name'].to_numpy()]
+    for pos in order:
+        index.setdefault(names[pos], int(pos))
+
+    for column in ALT_TITLE_COLUMNS:
+        if column not in df:
+            continue
+        titles = df[column].to_numpy()
+        for pos in order:
+            value = titles[pos]
+            if not isinstance(value, str):
+                continue
+            for title in value.split(ALT_TITLE_SEPARATOR):
+                key = normalize_name(title)
+                if key:
+                    index.setdefault(key, int(pos))
+    return index
+
+
+def build_id_index(df):
+    """Map anime_id to row position"""
+    return {int(anime_id): pos for pos, anime_id in enumerate(df['anime_id'].to_numpy())}
+
+
+def _ngrams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def _pack_strings(strings):
+    """Encode strings as one UTF-8 blob (uint8 array) plus int64 offsets"""
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(s) for s in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def _pack_postings(postings):
+    """Sorted keys of a {key: [values]} dict as a packed string list, plus CSR indptr and sorted values"""
+    keys = sorted(postings, key=lambda key: key.encode('utf-8'))
+    lists = [np.sort(np.asarray(postings[key], dtype=np.int32)) for key in keys]
+    indptr = np.zeros(len(lists) + 1, dtype=np.int64)
+    np.cumsum([len(p) for p in lists], out=indptr[1:])
+    values = np.concatenate(lists) if lists else np.empty(0, dtype=np.int32)
+    return _pack_strings(keys), indptr, values
+
+
+class _Strings:
+    """Read-only sequence of UTF-8 byte strings over a blob and offsets (bisect-able)"""
+
+    def __init__(self, blob, offsets):
+        # Plain ndarray views: slicing a np.memmap is several times slower
+        self.blob = np.asarray(blob)
+        self.offsets = np.asarray(offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes()
+
+    def decode_all(self):
+        """Every string, decoded"""
+        blob = self.blob.tobytes()
+        bounds = zip(self.offsets[:-1].tolist(), self.offsets[1:].tolist())
+        return [blob[start:end].decode('utf-8') for start, end in bounds]
+
+    def lengths(self, start, stop):
+        return np.diff(self.offsets[start:stop + 1])
+
+    def find(self, key):
+        """Index of key, or None"""
+        i = bisect.bisect_left(self, key)
+        return i if i < len(self) and self[i] == key else None
+
+    def prefix_range(self, prefix):
+        """[start, stop) of the strings starting with prefix"""
+        start = bisect.bisect_left(self, prefix)
+        # UTF-8 never contains 0xff, so incrementing the last byte always yields the successor
+        stop = bisect.bisect_left(self, prefix[:-1] + bytes([prefix[-1] + 1]), start)
+        return start, stop
+
+
+def _smallest(values, k):
+    """The k smallest values, sorted (all of them when k is None)"""
+    if k is not None and k <= 0:
+        return values[:0]
+    if k is not None and k < len(values):
+        values = np.partition(values, k - 1)[:k]
+    return np.sort(values)
+
+
+class SearchIndex:
+    """
+    Title and genre search over flat, persistable arrays
+
+    Every row is numbered by its rank in members order, so each list of
+    candidates kept in rank order is already in popularity order. Exact,
+    prefix and word-prefix matches come from a binary search over the
+    sorted word suffixes of all names ("shingeki no kyojin", "no kyojin",
+    "kyojin"); substring matches intersect n-gram posting lists and are only
+    verified until `limit` results are found. Genre matches search each
+    distinct genres string whole ("action, comedy"), as the genres column
+    reads, so a query may span several genres. The work for a short query
+    with a limit is a few vectorized passes over its matches, not a Python
+    loop over them.
+
+    All state is numpy arrays (see get_state), so it can be stored in the
+    model artifact and memory-mapped instead of rebuilt.
+    """
+
+    GRAM_SIZE = 3
+    STATE_ARRAYS = (
+        'names_blob', 'names_offsets', 'by_rank',
+        'suffix_blob', 'suffix_offsets', 'suffix_ranks', 'suffix_start',
+        'gram_blob', 'gram_offsets', 'gram_indptr', 'gram_ranks',
+        'genre_blob', 'genre_offsets', 'genre_of_rank',
+    )
+
+    def __init__(self, df):
+        names = [normalize_name(name) for name in df['name'].to_numpy()]
+        members = pd.to_numeric(df['members'], errors='coerce').fillna(0).to_numpy()
+        by_rank = np.argsort(-members, kind='stable').astype(np.int32)
+        rank = np.empty(len(by_rank), dtype=np.int32)
+        rank[by_rank] = np.arange(len(by_rank), dtype=np.int32)
+
+        suffixes, suffix_ranks, suffix_start = [], [], []
+        postings = {}
+        for pos, name in enumerate(names):
+            r = int(rank[pos])
+            start = 0
+            while True:
+                suffixes.append(name[start:])
+                suffix_ranks.append(r)
+                suffix_start.append(start == 0)
+                start = name.find(' ', start) + 1
+                if start == 0:
+                    break
+            grams = set()
+            for n in range(1, self.GRAM_SIZE + 1):
+                grams |= _ngrams(name, n)
+            for gram in grams:
+                postings.setdefault(gram, []).append(r)
+        encoded = [s.encode('utf-8') for s in suffixes]
+        order = sorted(range(len(encoded)), key=encoded.__getitem__)
+
+        # Catalogs repeat a few thousand genre combinations at most, so each
+        # rank points at its distinct normalized genres string
+        genre_keys = {}
+        genre_of_rank = np.full(len(by_rank), -1, dtype=np.int32)
+        for pos, genres in enumerate(df['genres'].to_numpy()):
+            key = normalize_name(genres) if isinstance(genres, str) else ''
+            if key:
+                genre_of_rank[rank[pos]] = genre_keys.setdefault(key, len(genre_keys))
+
+        state = {'by_rank': by_rank}
+        state['names_blob'], state['names_offsets'] = _pack_strings(names)
+        state['suffix_blob'], state['suffix_offsets'] = _pack_strings([suffixes[i] for i in order])
+        state['suffix_ranks'] = np.asarray(suffix_ranks, dtype=np.int32)[order]
+        state['suffix_start'] = np.asarray(suffix_start, dtype=bool)[order]
+        (state['gram_blob'], state['gram_offsets']), state['gram_indptr'], state['gram_ranks'] = (
+            _pack_postings(postings)
+        )
+        state['genre_blob'], state['genre_offsets'] = _pack_strings(list(genre_keys))
+        state['genre_of_rank'] = genre_of_rank
+        self._set_state(state)
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild an index from get_state() arrays (e.g. memory-mapped from an artifact)"""
+        index = cls.__new__(cls)
+        index._set_state(state)
+        return index
+
+    def get_state(self):
+        """Dict of the arrays that make up the index"""
+        return dict(self._state)
+
+    def _set_state(self, state):
+        self._state = {name: state[name] for name in self.STATE_ARRAYS}
+        state = {name: np.asarray(array) for name, array in self._state.items()}
+        self.by_rank = state['by_rank']
+        self.names = _Strings(state['names_blob'], state['names_offsets'])
+        self.suffixes = _Strings(state['suffix_blob'], state['suffix_offsets'])
+        self.suffix_ranks = state['suffix_ranks']
+        self.suffix_start = state['suffix_start']
+        self.grams = _Strings(state['gram_blob'], state['gram_offsets'])
+        self.gram_indptr = state['gram_indptr']
+        self._gram_slots = {}
+        self.gram_ranks = state['gram_ranks']
+        self.genres = _Strings(state['genre_blob'], state['genre_offsets'])
+        self._genre_strings = np.array([self.genres[i] for i in range(len(self.genres))], dtype=bytes)
+        self.genre_of_rank = state['genre_of_rank']
+
+    def normalized_names(self):
+        """normalize_name() of every title, by row position"""
+        return self.names.decode_all()
+
+    def _posting(self, gram):
+        # Lookups are memoized; the cache is bounded by the gram vocabulary
+        i = self._gram_slots.get(gram, -1)
+        if i == -1:
+            i = self._gram_slots[gram] = self.grams.find(gram)
+        if i is None:
+            return None
+        return self.gram_ranks[self.gram_indptr[i]:self.gram_indptr[i + 1]]
+
+    def _substring_candidates(self, query):
+        """Ranks of the names that may contain query, in rank order"""
+        if len(query) <= self.GRAM_SIZE:
+            # Every gram up to GRAM_SIZE is indexed, so this list is exact
+            return self._posting(query.encode('utf-8'))
+        lists = [self._posting(gram.encode('utf-8')) for gram in _ngrams(query, self.GRAM_SIZE)]
+        if any(p is None for p in lists):
+            return None
+        lists.sort(key=len)
+        candidates = lists[0]
+        for p in lists[1:]:
+            candidates = np.intersect1d(candidates, p, assume_unique=True)
+            if len(candidates) == 0:
+                break
+        return candidates
+
+    def _genre_matches(self, encoded):
+        """Mask over the distinct genres strings containing encoded, with a False slot for -1"""
+        matched = np.zeros(len(self.genres) + 1, dtype=bool)
+        if len(self.genres):
+            matched[:-1] = np.char.find(self._genre_strings, encoded) >= 0
+        return matched
+
+    def _genre_candidates(self, matched, need):
+        """Chunks of the ranks whose genres string is marked in matched, in rank order"""
+        step = max(16 * (need or 0), 1 << 14)
+        for start in range(0, len(self.genre_of_rank), step):
+            yield start + np.flatnonzero(matched[self.genre_of_rank[start:start + step]]).astype(np.int32)
+
+    @staticmethod
+    def _chunks(candidates, need):
+        """Slices of candidates, sized so a limited search usually needs only the first"""
+        step = max(4 * (need or 0), 256)
+        for start in range(0, len(candidates), step):
+            yield candidates[start:start + step]
+
+    def _take_new(self, chunks, found, need, verify=None):
+        """Up to `need` candidates (in their order) not in found and passing verify"""
+        taken = []
+        for chunk in chunks:
+            if len(found):
+                chunk = chunk[~np.isin(chunk, found)]
+            if verify is not None:
+                chunk = chunk[[verify(int(r)) for r in chunk]] if len(chunk) else chunk
+            taken.append(chunk)
+            if need is not None and sum(len(c) for c in taken) >= need:
+                break
+        if not taken:
+            return np.empty(0, dtype=np.int32)
+        taken = np.concatenate(taken)
+        return taken if need is None else taken[:need]
+
+    def search(self, query, limit=None):
+        """
+        Find titles whose name or genres contain query
+
+        Results are ranked by match quality (exact name, name prefix, word
+        prefix, substring, then genre-only matches) and then by members.
+
+        Returns:
+            Array of row positions
+        """
+        query = normalize_name(query)
+        if not query:
+            return np.empty(0, dtype=np.int32)
+        encoded = query.encode('utf-8')
+
+        def need():
+            return None if limit is None else limit - sum(len(t) for t in tiers)
+
+        # Tiers 0-2: exact name, name prefix and word prefix from the suffix range
+        start, stop = self.suffixes.prefix_range(encoded)
+        ranks = self.suffix_ranks[start:stop]
+        is_name = self.suffix_start[start:stop]
+        exact = is_name & (self.suffixes.lengths(start, stop) == len(encoded))
+        tiers = [np.sort(ranks[exact])]
+        tiers.append(_smallest(ranks[is_name & ~exact], need()))
+        if need() is None or need() > 0:
+            word = np.unique(ranks[~is_name])
+            if len(word) and is_name.any():
+                word = word[~np.isin(word, ranks[is_name])]
+            tiers.append(_smallest(word, need()))
+
+        # Tier 3: other substring matches, verified only as far as needed
+        if need() is None or need() > 0:
+            candidates = self._substring_candidates(query)
+            if candidates is not None:
+                def contains(r):
+                    return encoded in self.names[self.by_rank[r]]
+
+                # Longer queries only matched every trigram: check the names themselves
+                verify = contains if len(query) > self.GRAM_SIZE else None
+                chunks = self._chunks(candidates, need())
+                tiers.append(self._take_new(chunks, np.concatenate(tiers), need(), verify))
+
+        # Tier 4: genre-only matches
+        if need() is None or need() > 0:
+            matched = self._genre_matches(encoded)
+            if matched.any():
+                chunks = self._genre_candidates(matched, need())
+                tiers.append(self._take_new(chunks, np.concatenate(tiers), need()))
+
+        ranks = np.concatenate(tiers).astype(np.intp)
+        if limit is not None:
+            ranks = ranks[:limit]
+        return self.by_rank[ranks]
+
+
+class GenreIndex:
+    """
+    Packed genre bitsets and categorical type codes for vectorized filtering
+
+    Each title's genres are parsed once into a row of bits (titles x genres,
+    packed eight genres per byte), so multi-genre AND/OR filters are byte-wise
+    mask operations instead of substring scans over the genres strings. The
+    bits and genre vocabulary can be persisted (see get_state); type, score
+    and episode columns are cheap to take from the catalog again.
+    """
+
+    def __init__(self, df):
+        genre_lists = [
+            [g.strip() for g in genres.split(',') if g.strip()] if isinstance(genres, str) else []
+            for genres in df['genres'].to_numpy()
+        ]
+        self.genres = sorted({g for genres in genre_lists for g in genres})
+        self.genre_ids = {normalize_name(g): i for i, g in enumerate(self.genres)}
+
+        bits = np.zeros((len(df), len(self.genres)), dtype=bool)
+        for pos, genres in enumerate(genre_lists):
+            bits[pos, [self.genre_ids[normalize_name(g)] for g in genres]] = True
+        self.bits = np.packbits(bits, axis=1)
+        self._set_columns(df)
+
+    @classmethod
+    def from_state(cls, df, state):
+        """Rebuild an index over df from get_state() arrays (e.g. memory-mapped from an artifact)"""
+        index = cls.__new__(cls)
+        index.genres = _Strings(state['genre_blob'], state['genre_offsets']).decode_all()
+        index.genre_ids = {normalize_name(g): i for i, g in enumerate(index.genres)}
+        index.bits = np.asarray(state['bits'])
+        index._set_columns(df)
+        return index
+
+    def get_state(self):
+        """Dict of the arrays that make up the genre bitsets"""
+        genre_blob, genre_offsets = _pack_strings(self.genres)
+        return {'bits': self.bits, 'genre_blob': genre_blob, 'genre_offsets': genre_offsets}
+
+    def _set_columns(self, df):
+        types = pd.Categorical(df['type'])
+        self.types = list(types.categories)
+        self.type_codes = types.codes
+        self.type_ids = {}
+        for code, anime_type in enumerate(self.types):
+            self.type_ids.setdefault(normalize_name(anime_type), []).append(code)
+        self.score = pd.to_numeric(df['score'], errors='coerce').to_numpy(dtype=np.float32)
+        self.episodes = pd.to_numeric(df['episodes'], errors='coerce').to_numpy(dtype=np.float32)
+
+    def genre_mask(self, genres):
+        """Packed byte mask selecting the given genres (unknown genres are skipped)"""
+        selected = np.zeros(len(self.genres), dtype=bool)
+        for genre in genres:
+            column = self.genre_ids.get(normalize_name(genre))
+            if column is not None:
+                selected[column] = True
+        return np.packbits(selected), selected.sum()
+
+    def type_code_list(self, types):
+        """Category codes of the given types, matched like genres (unknown types are skipped)"""
+        return [code for anime_type in types for code in self.type_ids.get(normalize_name(anime_type), [])]
+
+    def query(self, genres=None, match='all', types=None, min_score=None, max_score=None,
+              min_episodes=None, max_episodes=None, positions=None):
+        """
+        Find titles matching every given criterion
+
+        Args:
+            genres: Genre names to filter by
+            match: 'all' requires every genre, 'any' requires at least one
+            types: Allowed values of the type column, matched like genres
+            min_score, max_score: Inclusive score range
+            min_episodes, max_episodes: Inclusive episode range
+            positions: Restrict the result to these row positions (order is kept)
+
+        Returns:
+            Array of matching row positions
+        """
+        if match not in ('all', 'any'):
+            raise ValueError(f"Unknown match mode: {match}")
+        mask = np.ones(len(self.score), dtype=bool)
+
+        if genres:
+            genres = [genres] if isinstance(genres, str) else list(genres)
+            packed, found = self.genre_mask(genres)
+            if match == 'all':
+                if found < len(set(normalize_name(g) for g in genres)):
+                    return np.empty(0, dtype=np.intp)
+                mask &= ((self.bits & packed) == packed).all(axis=1)
+            else:
+                mask &= (self.bits & packed).any(axis=1)
+        if types:
+            types = [types] if isinstance(types, str) else list(types)
+            mask &= np.isin(self.type_codes, self.type_code_list(types))
+        if min_score is not None:
+            mask &= self.score >= min_score
+        if max_score is not None:
+            mask &= self.score <= max_score
+        if min_episodes is not None:
+            mask &= self.episodes >= min_episodes
+        if max_episodes is not None:
+            mask &= self.episodes <= max_episodes
+
+        if positions is not None:
+            positions = np.asarray(positions, dtype=np.intp)
+            return positions[mask[positions]]
+        return np.flatnonzero(mask)
+
+
+def sort_order(values, ascending=False):
+    """
+    Stable argsort of a column's values
+
+    Numeric columns keep missing values last in both directions; other
+    columns (e.g. names) are reversed for a descending order.
+    """
+    if ascending:
+        return np.argsort(values, kind='stable')
+    if np.issubdtype(values.dtype, np.number):
+        return np.argsort(-values, kind='stable')
+    return np.argsort(values, kind='stable')[::-1]
+
+
+class SortIndex:
+    """
+    Precomputed sort permutations for paginating the catalog
+
+    Each order is stored with its inverse (the rank of every row), so a
+    sorted window of an arbitrary subset of rows costs a partial sort of the
+    subset instead of a sort of the whole catalog, and a window of the full
+    catalog is a slice. Every sortable column is ordered up front; other
+    orders are built on first use. update() merges changed rows into the
+    stored orders instead of re-sorting.
+    """
+
+    DEFAULT_ORDERS = (('score', False), ('members', False), ('episodes', False), ('name', True))
+
+    def __init__(self, df, orders=DEFAULT_ORDERS):
+        self.df = df
+        self.orders = {}
+        self.ranks = {}
+        for column, ascending in orders:
+            if column in df:
+                self.order(column, ascending)
+
+    def order(self, column, ascending=False):
+        """Row positions of the whole catalog sorted by a column, with their ranks"""
+        key = (column, bool(ascending))
+        if key not in self.orders:
+            order = sort_order(self.df[column].to_numpy(), ascending).astype(np.int32)
+            rank = np.empty(len(order), dtype=np.int32)
+            rank[order] = np.arange(len(order), dtype=np.int32)
+            self.ranks[key] = rank
+            self.orders[key] = order
+        return self.orders[key], self.ranks[key]
+
+    def window(self, positions=None, column='score', ascending=False, offset=0, limit=None):
+        """
+        Sorted window of a set of rows
+
+        Args:
+            positions: Row positions to sort (e.g. a filter result); None means every row
+            column, ascending: Sort order
+            offset, limit: Window into the sorted rows (limit None = to the end)
+
+        Returns:
+            (window positions, total number of rows in the sorted set)
+        """
+        order, rank = self.order(column, ascending)
+        if positions is None:
+            total = len(order)
+            stop = total if limit is None else offset + limit
+            return order[offset:stop], total
+
+        positions = np.asarray(positions, dtype=np.intp)
+        total = len(positions)
+        stop = total if limit is None else min(offset + limit, total)
+        if offset >= stop:
+            return np.empty(0, dtype=np.intp), total
+        ranks = rank[positions]
+        if stop < total:
+            # Only the first `stop` rows of the order are needed
+            keep = np.argpartition(ranks, stop - 1)[:stop]
+            positions, ranks = positions[keep], ranks[keep]
+        return positions[np.argsort(ranks)][offset:stop], total
+
+    def update(self, df, changed):
+        """
+        Merge changed rows into every stored order
+
+        Args:
+            df: The updated catalog; rows may only have been changed in place
+                or appended
+            changed: Positions of the updated and appended rows
+
+        Unchanged rows keep their relative order, so each order is patched
+        with a binary search per changed row and one O(N) insert rather than
+        a full sort. Ties with unchanged rows are broken as if the changed
+        rows had been appended.
+        """
+        self.df = df
+        changed = np.unique(np.asarray(changed, dtype=np.intp))
+        for column, ascending in list(self.orders):
+            order, rank = self.orders[(column, ascending)], self.ranks[(column, ascending)]
+            values = df[column].to_numpy()
+            keep = np.delete(order, rank[changed[changed < len(rank)]])
+            moved = changed[sort_order(values[changed], ascending)]
+
+            keys, moved_keys = values[keep], values[moved]
+            if ascending:
+                at = np.searchsorted(keys, moved_keys, side='right')
+            elif np.issubdtype(keys.dtype, np.number):
+                at = np.searchsorted(-keys, -moved_keys, side='right')
+            else:
+                # Descending text is a reversed ascending order: search it from the end
+                at = len(keys) - np.searchsorted(keys[::-1], moved_keys[::-1], side='right')[::-1]
+            order = np.insert(keep, at, moved).astype(np.int32)
+            rank = np.empty(len(order), dtype=np.int32)
+            rank[order] = np.arange(len(order), dtype=np.int32)
+            self.orders[(column, ascending)], self.ranks[(column, ascending)] = order, rank
+
+
+class Leaderboards:
+    """
+    Top-N titles by score overall, per genre, per type and per genre/type pair
+
+    Boards are cut from SortIndex's score order once, so a query like the top
+    30 Action TV series is an array slice. Unscored titles are left out:
+    the catalog cleaning fills a missing score with 0.
+    Queries for more than `size` rows (or for groups without a board) fall
+    back to walking the score order.
+    """
+
+    SIZE = 100
+
+    def __init__(self, sort_index, genre_index, size=SIZE):
+        self.size = size
+        self.sort_index = sort_index
+        self.genre_index = genre_index
+        self.boards = {}
+        for key, ranked in self._ranked_groups():
+            self.boards[key] = ranked[:size]
+
+    @staticmethod
+    def _scored(score):
+        """Mask of the titles that have a score (missing scores are 0, or NaN before cleaning)"""
+        return score > 0
+
+    def _scored_order(self):
+        """Score order without the unscored titles (sorted to the end)"""
+        order, _ = self.sort_index.order('score', False)
+        return order[:np.count_nonzero(self._scored(self.genre_index.score))]
+
+    def _genre_column(self, genre_id):
+        """Boolean mask of the titles with the given genre column"""
+        return (self.genre_index.bits[:, genre_id >> 3] >> (7 - (genre_id & 7))) & 1 == 1
+
+    def _ranked_groups(self):
+        """Yield (key, positions in score order) for every board"""
+        order = self._scored_order()
+        index = self.genre_index
+        yield (None, None), order
+        for anime_type, codes in index.type_ids.items():
+            yield (None, anime_type), order[np.isin(index.type_codes[order], codes)]
+        for genre_id, genre in enumerate(index.genres):
+            ranked = order[self._genre_column(genre_id)[order]]
+            yield (normalize_name(genre), None), ranked
+            ranked_codes = index.type_codes[ranked]
+            for anime_type, codes in index.type_ids.items():
+                yield (normalize_name(genre), anime_type), ranked[np.isin(ranked_codes, codes)]
+
+    def _ranked(self, key):
+        """Positions of one group in score order (walks the whole order)"""
+        genre, anime_type = key
+        order = self._scored_order()
+        index = self.genre_index
+        if genre is not None:
+            genre_id = index.genre_ids.get(genre)
+            if genre_id is None:
+                return np.empty(0, dtype=np.int32)
+            order = order[self._genre_column(genre_id)[order]]
+        if anime_type is not None:
+            codes = index.type_ids.get(anime_type)
+            if codes is None:
+                return np.empty(0, dtype=np.int32)
+            order = order[np.isin(index.type_codes[order], codes)]
+        return order
+
+    def top(self, n=10, genre=None, anime_type=None):
+        """Row positions of the n best-scored titles, optionally within a genre and/or type"""
+        key = (normalize_name(genre) if genre else None, normalize_name(anime_type) if anime_type else None)
+        board = self.boards.get(key)
+        if board is not None and (n <= self.size or len(board) < self.size):
+            return board[:n]
+        return self._ranked(key)[:n]
+
+    def _row_keys(self, pos):
+        """Keys of every board a row belongs to"""
+        index = self.genre_index
+        genres = [None] + [
+            normalize_name(index.genres[i])
+            for i in np.flatnonzero(np.unpackbits(index.bits[pos])[:len(index.genres)])
+        ]
+        code = index.type_codes[pos]
+        types = [None] if code < 0 else [None, normalize_name(index.types[code])]
+        return {(genre, anime_type) for genre in genres for anime_type in types}
+
+    def update(self, sort_index, genre_index, changed):
+        """
+        Patch the boards affected by changed rows
+
+        Call after sort_index.update() with the rebuilt GenreIndex. Only the
+        boards that held a changed row or that a changed row now belongs to
+        are touched; a full board that loses a row to a change is refilled
+        from the score order.
+        """
+        self.sort_index = sort_index
+        self.genre_index = genre_index
+        changed = np.unique(np.asarray(changed, dtype=np.intp))
+        _, rank = sort_index.order('score', False)
+        scored = self._scored(genre_index.score[changed])
+
+        joined = {}
+        for pos in changed[scored]:
+            for key in self._row_keys(pos):
+                joined.setdefault(key, []).append(pos)
+        left = {key for key, board in self.boards.items() if np.isin(board, changed).any()}
+
+        for key in left | set(joined):
+            board = self.boards.get(key, np.empty(0, dtype=np.int32))
+            kept = board[~np.isin(board, changed)]
+            merged = np.concatenate([kept, np.array(joined.get(key, []), dtype=np.int32)])
+            merged = merged[np.argsort(rank[merged])]
+            if len(board) == self.size:
+                # Titles just below a full board may now outrank changed rows
+                # placed after its last unchanged entry
+                if len(kept):
+                    merged = merged[rank[merged] <= rank[kept].max()]
+                if len(merged) < self.size:
+                    merged = self._ranked(key)
+            self.boards[key] = merged[:self.size]
+
+
+class CatalogStats:
+    """
+    Catalog-wide aggregates computed once when the model is built
+
+    Holds everything the app's header, Browse and Stats views need, so a
+    rerun reads a few small fields instead of walking the genres column.
+    """
+
+    SCORE_BINS = 25
+
+    def __init__(self, count, genre_counts, type_counts, score_mean, episodes_total,
+                 score_hist_counts, score_hist_edges):
+        self.count = count
+        self.genre_counts = genre_counts
+        self.type_counts = type_counts
+        self.score_mean = score_mean
+        self.episodes_total = episodes_total
+        self.score_hist_counts = score_hist_counts
+        self.score_hist_edges = score_hist_edges
+
+    @property
+    def genres(self):
+        """Sorted genre vocabulary"""
+        return sorted(self.genre_counts)
+
+    @classmethod
+    def from_catalog(cls, df):
+        """Compute the statistics of a catalog DataFrame"""
+        genres = df['genres'].dropna().str.split(',').explode().str.strip()
+        genre_counts = genres[genres != ''].value_counts()
+        type_counts = df['type'].value_counts()
+        scores = pd.to_numeric(df['score'], errors='coerce').dropna().to_numpy()
+        hist_counts, hist_edges = np.histogram(scores, bins=cls.SCORE_BINS)
+        return cls(
+            count=len(df),
+            genre_counts={str(g): int(c) for g, c in genre_counts.items()},
+            type_counts={str(t): int(c) for t, c in type_counts.items()},
+            score_mean=float(scores.mean()) if len(scores) else 0.0,
+            episodes_total=int(pd.to_numeric(df['episodes'], errors='coerce').sum()),
+            score_hist_counts=hist_counts.tolist(),
+            score_hist_edges=hist_edges.tolist()
+        )
+
+    def to_dict(self):
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
@@ -0,0 +1,173 @@
+import json
+import os
+
+import pandas as pd
+
+# Explicit dtypes so the parser skips type inference; numeric columns fall
+# back to inference when a file has missing ids/counts or malformed numbers
+CSV_DTYPES = {
+    'anime_id': 'int64',
+    'name': 'str',
+    'title_english': 'str',
+    'title_synonyms': 'str',
+    'score': 'float64',
+    'genres': 'str',
+    'type': 'str',
+    'episodes': 'float64',
+    'members': 'int64',
+    'synopsis': 'str',
+    'image_url': 'str',
+}
+
+SIDECAR_FORMATS = ('parquet', 'feather')
+
+
+def has_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def read_columns(path):
+    """Column names of a catalog CSV, in file order"""
+    return pd.read_csv(path, nrows=0).columns.tolist()
+
+
+def read_csv(path, columns=None, engine=None):
+    """
+    Read a catalog CSV, parsing only the requested columns
+
+    Args:
+        path: CSV file
+        columns: Columns to load (missing ones are skipped); None loads every column
+        engine: pandas CSV engine, 'c' (default) or 'pyarrow'. The pyarrow engine
+            is multi-threaded but cannot parse values spanning several lines
+            (common in synopses); such files fall back to the C engine.
+    """
+    header = read_columns(path)
+    usecols = header if columns is None else [c for c in header if c in columns]
+    engine = engine or 'c'
+    if engine == 'pyarrow' and not has_pyarrow():
+        engine = 'c'
+    dtypes = {c: CSV_DTYPES[c] for c in usecols if c in CSV_DTYPES}
+    try:
+        return _read_csv(path, usecols, dtypes, engine)
+    except pd.errors.ParserError:
+        if engine != 'pyarrow':
+            raise
+        print(f"⚠️ pyarrow could not parse {path} (multi-line values?), using the C engine")
+        return _read_csv(path, usecols, dtypes, 'c')
+
+
+def _read_csv(path, usecols, dtypes, engine):
+    try:
+        return pd.read_csv(path, usecols=usecols, dtype=dtypes, engine=engine)
+    except pd.errors.ParserError:
+        raise
+    except (ValueError, TypeError):
+        strings = {c: dtype for c, dtype in dtypes.items() if dtype == 'str'}
+        return pd.read_csv(path, usecols=usecols, dtype=strings, engine=engine)
+
+
+def sidecar_path(path, fmt='parquet'):
+    """Sidecar file next to the CSV, e.g. anime.csv -> anime.parquet"""
+    return f'{os.path.splitext(path)[0]}.{fmt}'
+
+
+def _source_stamp(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _sidecar_is_current(path, sidecar):
+    try:
+        with open(f'{sidecar}.json', encoding='utf-8') as f:
+            return json.load(f) == _source_stamp(path) and os.path.exists(sidecar)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return False
+
+
+def build_sidecar(path, fmt='parquet'):
+    """Convert the CSV to a columnar sidecar file and record which CSV it came from"""
+    if fmt not in SIDECAR_FORMATS:
+        raise ValueError(f"Unknown sidecar format: {fmt}")
+    sidecar = sidecar_path(path, fmt)
+    stamp = _source_stamp(path)
+    df = read_csv(path)
+    tmp_path = f'{sidecar}.tmp'
+    if fmt == 'parquet':
+        df.to_parquet(tmp_path, index=False)
+    else:
+        df.to_feather(tmp_path)
+    os.replace(tmp_path, sidecar)
+    with open(f'{sidecar}.json', 'w', encoding='utf-8') as f:
+        json.dump(stamp, f)
+    print(f"🗂️ Wrote {fmt} sidecar {sidecar} for {path}")
+    return sidecar
+
+
+def _sidecar(path, fmt):
+    """Path of an up-to-date sidecar (rebuilt if the CSV changed), or None when unavailable"""
+    if fmt is None or not has_pyarrow():
+        return None
+    sidecar = sidecar_path(path, fmt)
+    if not _sidecar_is_current(path, sidecar):
+        try:
+            build_sidecar(path, fmt)
+        except OSError as e:
+            print(f"⚠️ Could not write {sidecar}, reading the CSV directly: {e}")
+            return None
+    return sidecar
+
+
+def load_catalog(path, columns=None, sidecar='parquet', engine=None):
+    """
+    Load the catalog, reading only the requested columns
+
+    With pyarrow installed, the CSV is converted once to a Parquet (or
+    Feather) sidecar, which is rebuilt whenever the CSV's size or
+    modification time changes; later loads read just the requested columns
+    from it. Without pyarrow, or with sidecar=None, the CSV is parsed directly.
+
+    Args:
+        path: Catalog CSV
+        columns: Columns to load; None loads every column
+        sidecar: 'parquet', 'feather' or None
+        engine: CSV engine for the direct path (see read_csv)
+    """
+    source = _sidecar(path, sidecar)
+    if source is None:
+        return read_csv(path, columns, engine)
+    if columns is not None:
+        header = read_columns(path)
+        columns = [c for c in header if c in columns]
+    if sidecar == 'parquet':
+        return pd.read_parquet(source, columns=columns)
+    return pd.read_feather(source, columns=columns)
+
+
+def iter_column(path, column, chunk_size=10000, sidecar='parquet'):
+    """
+    Yield one column in chunks, skipping rows without a name or genres
+
+    The chunks line up with the rows of the cleaned catalog, so a long text
+    column can be streamed without loading it alongside the rest.
+    """
+    columns = ['name', 'genres', column]
+    source = _sidecar(path, sidecar)
+    if source is not None and sidecar == 'parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas().dropna(subset=['name', 'genres'])[column]
+        return
+    if source is not None:
+        chunks = [pd.read_feather(source, columns=columns)]
+    else:
+        dtypes = {c: 'str' for c in columns}
+        chunks = pd.read_csv(path, usecols=columns, dtype=dtypes, chunksize=chunk_size)
+    for chunk in chunks:
+        chunk = chunk.dropna(subset=['name', 'genres'])
+        for start in range(0, len(chunk), chunk_size):
+            yield chunk[column].iloc[start:start + chunk_size]
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+import pandas as pd
+
+CATALOG_COLUMNS = [
+    'anime_id', 'name', 'title_english', 'title_synonyms', 'score', 'genres',
+    'type', 'episodes', 'members', 'synopsis', 'image_url'
+]
+
+# Export columns that every anime.csv has had; the newer title columns are
+# only written when some row actually has them
+BASE_COLUMNS = ['anime_id', 'name', 'score', 'genres', 'type', 'episodes', 'members', 'synopsis', 'image_url']
+
+_COLUMN_TYPES = {'anime_id': int, 'score': float, 'episodes': float, 'members': int}
+
+
+def _clean(column, value):
+    """Convert a value to the plain Python type stored for its column"""
+    if value is None:
+        return None
+    try:
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        pass
+    if hasattr(value, 'item'):
+        value = value.item()
+    if column in _COLUMN_TYPES:
+        return _COLUMN_TYPES[column](value)
+    return value if value != '' else None
+
+
+def row_hash(row):
+    """Content hash of a catalog row, used to skip unchanged upserts"""
+    payload = json.dumps([row.get(c) for c in CATALOG_COLUMNS], default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class CatalogStore:
+    """
+    SQLite-backed anime catalog keyed by anime_id
+
+    Fetches upsert only new or changed rows, so ingest cost scales with the
+    delta rather than the catalog. anime.csv becomes an export that is
+    written on demand with export_csv().
+
+    Args:
+        path: SQLite database file
+        csv_path: CSV imported into an empty store (the pre-store database)
+        compact_ratio: Compact once this fraction of rows changed since the last compaction
+    """
+
+    def __init__(self, path='anime.db', csv_path='anime.csv', compact_ratio=0.2):
+        self.path = path
+        self.compact_ratio = compact_ratio
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS anime (
+                anime_id INTEGER NOT NULL UNIQUE,
+                name TEXT,
+                title_english TEXT,
+                title_synonyms TEXT,
+                score REAL,
+                genres TEXT,
+                type TEXT,
+                episodes REAL,
+                members INTEGER,
+                synopsis TEXT,
+                image_url TEXT,
+                row_hash TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        ''')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        self.conn.commit()
+
+        if len(self) == 0 and csv_path and os.path.exists(csv_path):
+            inserted, _ = self.upsert(pd.read_csv(csv_path))
+            print(f"📂 Imported {inserted} anime from {csv_path} into {path}")
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM anime').fetchone()[0]
+
+    def _get_meta(self, key, default=None):
+        row = self.conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key, value):
+        self.conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, str(value)))
+
+    def existing_ids(self):
+        """Set of every stored anime_id"""
+        return {row[0] for row in self.conn.execute('SELECT anime_id FROM anime')}
+
+    def upsert(self, rows):
+        """
+        Insert new rows and update changed ones
+
+        Args:
+            rows: DataFrame or list of dicts with catalog columns
+
+        Returns:
+            (inserted, updated) counts; unchanged rows are not written
+        """
+        if isinstance(rows, pd.DataFrame):
+            rows = rows.to_dict('records')
+        rows = [{c: _clean(c, row.get(c)) for c in CATALOG_COLUMNS} for row in rows]
+        if not rows:
+            return 0, 0
+
+        ids = [row['anime_id'] for row in rows]
+        known = {}
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            known.update(self.conn.execute(
+                f'SELECT anime_id, row_hash FROM anime WHERE anime_id IN ({placeholders})', chunk
+            ))
+
+        now = time.time()
+        inserts, updates = [], []
+        for row in rows:
+            digest = row_hash(row)
+            previous = known.get(row['anime_id'])
+            if previous == digest:
+                continue
+            values = [row[c] for c in CATALOG_COLUMNS] + [digest, now]
+            (inserts if previous is None else updates).append(values)
+            known[row['anime_id']] = digest
+
+        columns = CATALOG_COLUMNS + ['row_hash', 'updated_at']
+        assignments = ', '.join(f'{c} = excluded.{c}' for c in columns[1:])
+        self.conn.executemany(
+            f'INSERT INTO anime ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))}) '
+            f'ON CONFLICT(anime_id) DO UPDATE SET {assignments}',
+            inserts + updates
+        )
+        changed = int(self._get_meta('changes_since_compact', 0)) + len(updates)
+        self._set_meta('changes_since_compact', changed)
+        self.conn.commit()
+
+        if changed > self.compact_ratio * max(len(self), 1):
+            self.compact()
+        return len(inserts), len(updates)
+
+    def compact(self):
+        """Rebuild the database file to reclaim space left by updates"""
+        self._set_meta('changes_since_compact', 0)
+        self.conn.commit()
+        self.conn.execute('VACUUM')
+        self.conn.execute('ANALYZE')
+
+    def clear(self):
+        """Delete every stored anime"""
+        self.conn.execute('DELETE FROM anime')
+        self.conn.commit()
+        self.compact()
+
+    def to_dataframe(self, columns=None):
+        """Load the catalog (in insertion order) as a DataFrame"""
+        columns = columns or CATALOG_COLUMNS
+        return pd.read_sql_query(f'SELECT {", ".join(columns)} FROM anime ORDER BY rowid', self.conn)
+
+    def export_csv(self, path='anime.csv', chunk_size=5000):
+        """Write the catalog to CSV, streaming it in chunks"""
+        columns = list(BASE_COLUMNS)
+        for column in ('title_english', 'title_synonyms'):
+            query = f"SELECT 1 FROM anime WHERE {column} IS NOT NULL AND {column} != '' LIMIT 1"
+            if self.conn.execute(query).fetchone():
+                columns.insert(columns.index('score'), column)
+
+        tmp_path = f'{path}.tmp'
+        chunks = pd.read_sql_query(
+            f'SELECT {", ".join(columns)} FROM anime ORDER BY rowid', self.conn, chunksize=chunk_size
+        )
+        count = 0
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            for i, chunk in enumerate(chunks):
+                chunk.to_csv(f, index=False, header=(i == 0))
+                count += len(chunk)
+            if count == 0:
+                f.write(','.join(columns) + '\n')
+        os.replace(tmp_path, path)
+        return count
+
+    def close(self):
+        self.conn.close()
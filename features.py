@@ -0,0 +1,174 @@
+import numpy as np
+from scipy import sparse
+
+# scikit-learn is imported where it is used: loading a persisted model never
+# needs it unless new rows are vectorized
+
+CHANNELS = ('genres', 'type', 'synopsis')
+SYNOPSIS_FEATURES = 2 ** 18
+
+
+def _channel_text(df, channel):
+    if channel == 'content':
+        return df['genres'] + ' ' + df['type'].fillna('')
+    return df[channel].fillna('')
+
+
+class ContentFeatures:
+    """
+    Builds the TF-IDF feature matrix the similarity model runs on
+
+    With no weights, a single 'content' channel vectorizes genres and type
+    together (the original model). With weights, genres, type and synopsis are
+    vectorized as separate channels, each L2-normalized, scaled by its weight
+    and concatenated. The synopsis channel uses a stateless HashingVectorizer
+    with IDF accumulated chunk by chunk, so the raw synopsis corpus never has
+    to be held in memory at once. Output is sparse float32 with unit-norm rows.
+    Features restored with from_state() build their vectorizers on first use.
+
+    Args:
+        weights: Dict of channel -> weight over 'genres', 'type' and 'synopsis';
+            channels with weight 0 are skipped
+        synopsis_features: Hash space size for the synopsis channel
+    """
+
+    def __init__(self, weights=None, synopsis_features=SYNOPSIS_FEATURES):
+        if weights is not None:
+            unknown = set(weights) - set(CHANNELS)
+            if unknown:
+                raise ValueError(f"Unknown feature channels: {sorted(unknown)}")
+        self.weights = dict(weights) if weights is not None else None
+        self.synopsis_features = synopsis_features
+        self._vectorizers = {}
+        self._state = None
+        self.synopsis_idf = None
+
+    @property
+    def vectorizers(self):
+        """Fitted TfidfVectorizer per vocabulary channel"""
+        if self._state is not None:
+            from sklearn.feature_extraction.text import TfidfVectorizer
+
+            meta, arrays = self._state
+            for channel, vocabulary in meta['vocabularies'].items():
+                vectorizer = TfidfVectorizer(stop_words='english', dtype=np.float32, vocabulary=vocabulary)
+                vectorizer.idf_ = np.asarray(arrays[f'idf_{channel}'])
+                self._vectorizers[channel] = vectorizer
+            self._state = None
+        return self._vectorizers
+
+    @property
+    def channels(self):
+        if self.weights is None:
+            return ['content']
+        return [c for c in CHANNELS if self.weights.get(c, 0) > 0]
+
+    def _hasher(self):
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        return HashingVectorizer(
+            n_features=self.synopsis_features, alternate_sign=False, norm=None,
+            stop_words='english', dtype=np.float32
+        )
+
+    def _weight(self, channel):
+        return 1.0 if self.weights is None else float(self.weights[channel])
+
+    def _combine(self, blocks):
+        from sklearn.preprocessing import normalize
+
+        # Normalize even a single block: its channel weight would otherwise scale similarities
+        matrix = sparse.hstack(blocks, format='csr', dtype=np.float32)
+        return normalize(matrix, norm='l2', copy=False)
+
+    def _fit_synopsis(self, chunks):
+        """Hash synopsis chunks and accumulate document frequencies in one pass"""
+        hasher = self._hasher()
+        doc_freq = np.zeros(self.synopsis_features, dtype=np.int64)
+        counts = []
+        for text in chunks:
+            matrix = hasher.transform(text.fillna(''))
+            doc_freq += np.bincount(matrix.indices, minlength=self.synopsis_features)
+            counts.append(matrix)
+        n_docs = sum(m.shape[0] for m in counts)
+        # Smoothed IDF, matching TfidfVectorizer's default
+        self.synopsis_idf = (np.log((1 + n_docs) / (1 + doc_freq)) + 1).astype(np.float32)
+        return self._weight_synopsis(sparse.vstack(counts, format='csr'))
+
+    def _weight_synopsis(self, matrix):
+        from sklearn.preprocessing import normalize
+
+        matrix = matrix.astype(np.float32)
+        matrix.data *= self.synopsis_idf[matrix.indices]
+        return normalize(matrix, norm='l2', copy=False)
+
+    def fit_transform(self, df, synopsis_chunks=None):
+        """
+        Fit every channel on df and return the feature matrix
+
+        Args:
+            df: Catalog DataFrame
+            synopsis_chunks: Iterable of synopsis Series aligned with df's rows;
+                defaults to df['synopsis'] as a single chunk
+        """
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        blocks = []
+        for channel in self.channels:
+            if channel == 'synopsis':
+                matrix = self._fit_synopsis(synopsis_chunks if synopsis_chunks is not None else [df['synopsis']])
+            else:
+                vectorizer = TfidfVectorizer(stop_words='english', dtype=np.float32)
+                matrix = vectorizer.fit_transform(_channel_text(df, channel))
+                self._vectorizers[channel] = vectorizer
+            blocks.append(matrix * self._weight(channel))
+        return self._combine(blocks)
+
+    def transform(self, df):
+        """Vectorize new rows with the fitted vocabularies"""
+        blocks = []
+        for channel in self.channels:
+            if channel == 'synopsis':
+                matrix = self._weight_synopsis(self._hasher().transform(df['synopsis'].fillna('')))
+            else:
+                matrix = self.vectorizers[channel].transform(_channel_text(df, channel))
+            blocks.append(matrix * self._weight(channel))
+        return self._combine(blocks)
+
+    def vocabulary_drift(self, df):
+        """Fraction of df's tokens, over the vocabulary channels, that the fitted vocabularies lack"""
+        total = missing = 0
+        for channel, vectorizer in self.vectorizers.items():
+            analyzer = vectorizer.build_analyzer()
+            vocabulary = vectorizer.vocabulary_
+            for text in _channel_text(df, channel):
+                for token in analyzer(text):
+                    total += 1
+                    missing += token not in vocabulary
+        return missing / total if total else 0.0
+
+    def get_state(self):
+        """Return (JSON-serializable metadata, dict of arrays) describing the fitted model"""
+        if self._state is not None:
+            return self._state
+        meta = {
+            'weights': self.weights,
+            'synopsis_features': self.synopsis_features,
+            'vocabularies': {
+                channel: {term: int(i) for term, i in vectorizer.vocabulary_.items()}
+                for channel, vectorizer in self.vectorizers.items()
+            },
+        }
+        arrays = {f'idf_{c}': v.idf_.astype(np.float32) for c, v in self.vectorizers.items()}
+        if self.synopsis_idf is not None:
+            arrays['idf_synopsis'] = self.synopsis_idf
+        return meta, arrays
+
+    @classmethod
+    def from_state(cls, meta, arrays):
+        """Rebuild fitted features from get_state() output without refitting"""
+        features = cls(meta['weights'], meta['synopsis_features'])
+        features._state = (meta, arrays)
+        if 'idf_synopsis' in arrays:
+            features.synopsis_idf = arrays['idf_synopsis']
+        return features
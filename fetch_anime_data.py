@@ -1,86 +1,80 @@
-import requests
 import pandas as pd
 import numpy as np
-import time
 from datetime import datetime
 
+from catalog_index import CatalogStats
+from catalog_store import CatalogStore
+from jikan_client import fetch_pages
 
-def fetch_anime_data(num_pages=10, append_to_existing=True):
+
+def _anime_entry(anime):
+    """Convert a Jikan anime record into a catalog row"""
+    return {
+        'anime_id': anime['mal_id'],
+        'name': anime['title'],
+        'title_english': anime.get('title_english'),
+        'title_synonyms': '|'.join(anime.get('title_synonyms') or []),
+        'score': anime.get('score', 0) if anime.get('score') else 0,
+        'genres': ', '.join([g['name'] for g in anime.get('genres', [])]) if anime.get('genres') else '',
+        'type': anime.get('type', 'Unknown'),
+        'episodes': anime.get('episodes', 0) if anime.get('episodes') else 0,
+        'members': anime.get('members', 0),
+        'synopsis': anime.get('synopsis', ''),
+        'image_url': anime['images']['jpg']['image_url']
+    }
+
+
+def fetch_anime_data(num_pages=10, append_to_existing=True, store=None):
     """
     Fetch anime data from Jikan API
     
+    Pages are fetched concurrently at the API's rate limit (see jikan_client)
+    and upserted into the catalog store; call store.export_csv() to refresh anime.csv.
+    
     Args:
         num_pages: Number of pages to fetch (25 anime per page)
-        append_to_existing: If True, adds to existing anime.csv; if False, overwrites
+        append_to_existing: If True, adds to the existing store; if False, replaces it
+            once the fetch has returned rows (a failed fetch leaves the store untouched)
+        store: CatalogStore to write into (defaults to anime.db)
     
     Returns:
-        DataFrame with fetched anime data
+        DataFrame with the new anime, or None if nothing was written
     """
     anime_list = []
-    base_url = "https://api.jikan.moe/v4/anime"
+    store = store if store is not None else CatalogStore()
     
     print(f"🎌 Starting to fetch anime data...")
     print(f"📊 Pages to fetch: {num_pages} (approximately {num_pages * 25} anime)")
     print(f"{'='*50}")
     
-    # Load existing data if appending
+    # Load existing ids if appending
     existing_ids = set()
     if append_to_existing:
-        try:
-            existing_df = pd.read_csv('anime.csv')
-            existing_ids = set(existing_df['anime_id'].values)
-            print(f"📂 Found {len(existing_ids)} existing anime entries")
-        except FileNotFoundError:
-            print("📂 No existing file found, creating new database")
+        existing_ids = store.existing_ids()
+        print(f"📂 Found {len(existing_ids)} existing anime entries")
     
     success_count = 0
     duplicate_count = 0
     
-    for page in range(1, num_pages + 1):
-        try:
-            print(f"\n🔄 Fetching page {page}/{num_pages}...")
-            response = requests.get(f"{base_url}?page={page}&limit=25&order_by=popularity")
+    results = fetch_pages('/anime', {'limit': 25, 'order_by': 'popularity'}, range(1, num_pages + 1))
+    for page, data in results:
+        if isinstance(data, Exception):
+            print(f"❌ Error on page {page}: {data}")
+            continue
+        
+        for anime in data['data']:
+            anime_id = anime['mal_id']
             
-            if response.status_code == 200:
-                data = response.json()
-                
-                for anime in data['data']:
-                    anime_id = anime['mal_id']
-                    
-                    # Skip if already exists
-                    if anime_id in existing_ids:
-                        duplicate_count += 1
-                        continue
-                    
-                    anime_entry = {
-                        'anime_id': anime_id,
-                        'name': anime['title'],
-                        'score': anime.get('score', 0) if anime.get('score') else 0,
-                        'genres': ', '.join([g['name'] for g in anime.get('genres', [])]) if anime.get('genres') else '',
-                        'type': anime.get('type', 'Unknown'),
-                        'episodes': anime.get('episodes', 0) if anime.get('episodes') else 0,
-                        'members': anime.get('members', 0),
-                        'synopsis': anime.get('synopsis', ''),
-                        'image_url': anime['images']['jpg']['image_url']
-                    }
-                    
-                    anime_list.append(anime_entry)
-                    existing_ids.add(anime_id)
-                    success_count += 1
-                
-                print(f"✅ Page {page} complete! Added {success_count} new anime (Skipped {duplicate_count} duplicates)")
-                time.sleep(1)  # Rate limiting - respect the API
-                
-            elif response.status_code == 429:
-                print(f"⏸️  Rate limited. Waiting 60 seconds...")
-                time.sleep(60)
+            # Skip if already exists
+            if anime_id in existing_ids:
+                duplicate_count += 1
                 continue
-            else:
-                print(f"⚠️  Error on page {page}: Status code {response.status_code}")
-                
-        except Exception as e:
-            print(f"❌ Error on page {page}: {e}")
-            continue
+            
+            anime_list.append(_anime_entry(anime))
+            existing_ids.add(anime_id)
+            success_count += 1
+        
+        print(f"✅ Page {page} complete! Added {success_count} new anime (Skipped {duplicate_count} duplicates)")
     
     print(f"\n{'='*50}")
     print(f"📊 Fetch Summary:")
@@ -88,52 +82,50 @@ def fetch_anime_data(num_pages=10, append_to_existing=True):
     print(f"  ⏭️  Duplicates skipped: {duplicate_count}")
     
     # Save data
-    if anime_list:
-        new_df = pd.DataFrame(anime_list)
-        
-        if append_to_existing:
-            try:
-                existing_df = pd.read_csv('anime.csv')
-                combined_df = pd.concat([existing_df, new_df], ignore_index=True)
-                combined_df.drop_duplicates(subset=['anime_id'], keep='first', inplace=True)
-                combined_df.to_csv('anime.csv', index=False)
-                print(f"💾 Updated anime.csv - Total anime: {len(combined_df)}")
-                return combined_df
-            except FileNotFoundError:
-                new_df.to_csv('anime.csv', index=False)
-                print(f"💾 Created new anime.csv with {len(new_df)} anime")
-                return new_df
-        else:
-            new_df.to_csv('anime.csv', index=False)
-            print(f"💾 Saved {len(new_df)} anime to anime.csv (overwrite mode)")
-            return new_df
-    else:
+    if not anime_list:
         print("⚠️  No new anime to save")
         return None
+    
+    # Only replace the stored catalog once there is something to replace it with
+    if not append_to_existing:
+        store.clear()
+    inserted, updated = store.upsert(anime_list)
+    print(f"💾 Updated {store.path} - Total anime: {len(store)}")
+    if not (inserted or updated):
+        return None
+    return pd.DataFrame(anime_list)
 
 
-def fetch_top_anime(limit=100):
+def fetch_top_anime(limit=100, store=None):
     """
     Fetch top-rated anime
     
     Args:
         limit: Number of top anime to fetch
+        store: CatalogStore to write into (defaults to anime.db)
     """
     print(f"🏆 Fetching top {limit} anime...")
     num_pages = (limit // 25) + 1
-    return fetch_anime_data(num_pages=num_pages, append_to_existing=True)
+    return fetch_anime_data(num_pages=num_pages, append_to_existing=True, store=store)
 
 
-def fetch_by_genre(genre, num_pages=5):
+def fetch_by_genre(genre, num_pages=5, store=None):
     """
     Fetch anime by specific genre
     
+    Already-known anime are only rewritten if their data changed.
+    
     Args:
         genre: Genre name (e.g., 'Action', 'Comedy')
         num_pages: Number of pages to fetch
+        store: CatalogStore to write into (defaults to anime.db)
+    
+    Returns:
+        DataFrame with the fetched anime, or None if the genre is unknown or
+        nothing was written
     """
     anime_list = []
-    base_url = "https://api.jikan.moe/v4/anime"
+    store = store if store is not None else CatalogStore()
     
     # Genre IDs (you can find more at https://api.jikan.moe/v4/genres/anime)
     genre_map = {
@@ -149,91 +141,52 @@ def fetch_by_genre(genre, num_pages=5):
     
     print(f"🎭 Fetching {genre} anime...")
     
-    for page in range(1, num_pages + 1):
-        try:
-            response = requests.get(f"{base_url}?genres={genre_id}&page={page}&limit=25")
-            if response.status_code == 200:
-                data = response.json()
-                for anime in data['data']:
-                    anime_list.append({
-                        'anime_id': anime['mal_id'],
-                        'name': anime['title'],
-                        'score': anime.get('score', 0) if anime.get('score') else 0,
-                        'genres': ', '.join([g['name'] for g in anime.get('genres', [])]) if anime.get('genres') else '',
-                        'type': anime.get('type', 'Unknown'),
-                        'episodes': anime.get('episodes', 0) if anime.get('episodes') else 0,
-                        'members': anime.get('members', 0),
-                        'synopsis': anime.get('synopsis', ''),
-                        'image_url': anime['images']['jpg']['image_url']
-                    })
-                print(f"✅ Fetched page {page}")
-                time.sleep(1)
-        except Exception as e:
-            print(f"❌ Error: {e}")
+    results = fetch_pages('/anime', {'genres': genre_id, 'limit': 25}, range(1, num_pages + 1))
+    for page, data in results:
+        if isinstance(data, Exception):
+            print(f"❌ Error: {data}")
+            continue
+        anime_list.extend(_anime_entry(anime) for anime in data['data'])
+        print(f"✅ Fetched page {page}")
     
-    if anime_list:
-        # Append to existing
-        new_df = pd.DataFrame(anime_list)
-        try:
-            existing_df = pd.read_csv('anime.csv')
-            combined_df = pd.concat([existing_df, new_df], ignore_index=True)
-            combined_df.drop_duplicates(subset=['anime_id'], keep='first', inplace=True)
-            combined_df.to_csv('anime.csv', index=False)
-            print(f"💾 Added {len(new_df)} {genre} anime. Total: {len(combined_df)}")
-        except FileNotFoundError:
-            new_df.to_csv('anime.csv', index=False)
-            print(f"💾 Created new file with {len(new_df)} anime")
+    if not anime_list:
+        print(f"⚠️  No {genre} anime fetched")
+        return None
     
+    inserted, updated = store.upsert(anime_list)
+    print(f"💾 Added {inserted} {genre} anime, updated {updated}. Total: {len(store)}")
+    if not (inserted or updated):
+        return None
     return pd.DataFrame(anime_list)
 
 
-def show_stats():
+def show_stats(store=None):
     """Display statistics about current anime database"""
     try:
-        df = pd.read_csv('anime.csv')
+        df = (store if store is not None else CatalogStore()).to_dataframe()
         
-        # Handle NaN values in genres column
-        df['genres'] = df['genres'].fillna('')  # Replace NaN with empty string
+        stats = CatalogStats.from_catalog(df)
         
         print(f"\n{'='*50}")
         print(f"📊 ANIME DATABASE STATISTICS")
         print(f"{'='*50}")
-        print(f"📚 Total Anime: {len(df)}")
-        print(f"⭐ Average Score: {df['score'].mean():.2f}")
-        print(f"📺 Total Episodes: {int(df['episodes'].sum()):,}")
-        
-        # Safely extract unique genres by filtering out empty strings and NaN
-        unique_genres = set()
-        for genres in df['genres']:
-            if genres and isinstance(genres, str):  # Check if not empty and is string
-                for g in genres.split(','):
-                    genre = g.strip()
-                    if genre:  # Only add non-empty genres
-                        unique_genres.add(genre)
-        
-        print(f"🎭 Unique Genres: {len(unique_genres)}")
+        print(f"📚 Total Anime: {stats.count}")
+        print(f"⭐ Average Score: {stats.score_mean:.2f}")
+        print(f"📺 Total Episodes: {stats.episodes_total:,}")
+        print(f"🎭 Unique Genres: {len(stats.genre_counts)}")
         
         print(f"\n📊 Anime by Type:")
-        print(df['type'].value_counts().to_string())
+        for anime_type, count in stats.type_counts.items():
+            print(f"  {anime_type}: {count}")
         
         # Show top 5 most common genres
-        genre_counts = {}
-        for genres in df['genres']:
-            if genres and isinstance(genres, str):
-                for genre in genres.split(','):
-                    genre = genre.strip()
-                    if genre:
-                        genre_counts[genre] = genre_counts.get(genre, 0) + 1
-        
-        if genre_counts:
+        if stats.genre_counts:
             print(f"\n🎭 Top 5 Genres:")
-            sorted_genres = sorted(genre_counts.items(), key=lambda x: x[1], reverse=True)[:5]
+            sorted_genres = sorted(stats.genre_counts.items(), key=lambda x: x[1], reverse=True)[:5]
             for genre, count in sorted_genres:
                 print(f"  {genre}: {count}")
         
         print(f"{'='*50}\n")
-    except FileNotFoundError:
-        print("❌ No anime.csv file found!")
     except Exception as e:
         print(f"❌ Error reading stats: {e}")
 
@@ -251,33 +204,43 @@ if __name__ == "__main__":
     3. Fetch by genre
     4. Show current database stats
     5. Replace entire database (careful!)
+    6. Export anime.csv from the database
     """)
     
-    choice = input("Enter your choice (1-5): ").strip()
+    choice = input("Enter your choice (1-6): ").strip()
+    store = CatalogStore()
+    changed = False
     
     if choice == "1":
         pages = int(input("How many pages to fetch? (25 anime per page): "))
-        fetch_anime_data(num_pages=pages, append_to_existing=True)
+        changed = fetch_anime_data(num_pages=pages, append_to_existing=True, store=store) is not None
     elif choice == "2":
         limit = int(input("How many top anime? (e.g., 100): "))
-        fetch_top_anime(limit=limit)
+        changed = fetch_top_anime(limit=limit, store=store) is not None
     elif choice == "3":
         print("Available genres: Action, Adventure, Comedy, Drama, Fantasy, Horror, Romance, Sci-Fi, Sports, Supernatural, Thriller")
         genre = input("Enter genre name: ").strip()
         pages = int(input("How many pages? "))
-        fetch_by_genre(genre, num_pages=pages)
+        changed = fetch_by_genre(genre, num_pages=pages, store=store) is not None
     elif choice == "4":
-        show_stats()
+        show_stats(store)
     elif choice == "5":
         confirm = input("⚠️  This will DELETE all existing data! Type 'YES' to confirm: ")
         if confirm == "YES":
             pages = int(input("How many pages to fetch? "))
-            fetch_anime_data(num_pages=pages, append_to_existing=False)
+            changed = fetch_anime_data(num_pages=pages, append_to_existing=False, store=store) is not None
         else:
             print("Cancelled.")
+    elif choice == "6":
+        count = store.export_csv('anime.csv')
+        print(f"💾 Exported {count} anime to anime.csv")
     else:
         print("Invalid choice!")
     
+    # Exporting rewrites the whole CSV, so it only happens on demand (option 6)
+    if changed:
+        print("💡 The app reads anime.csv: choose option 6 to export the changes")
+    
     # Always show stats at the end if not just showing stats
     if choice != "4":
-        show_stats()
+        show_stats(store)
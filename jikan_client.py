@@ -0,0 +1,150 @@
+import asyncio
+import random
+import time
+from collections import deque
+
+import aiohttp
+
+BASE_URL = "https://api.jikan.moe/v4"
+
+# Jikan allows 3 requests per second and 60 requests per minute
+JIKAN_LIMITS = ((3, 1.0), (60, 60.0))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class SlidingWindow:
+    """Allow at most `rate` requests in any `period` seconds"""
+
+    def __init__(self, rate, period):
+        self.rate = rate
+        self.period = period
+        self.granted = deque()
+
+    def wait_time(self, now):
+        """Seconds until a request made at `now` would fit in the window"""
+        while self.granted and self.granted[0] <= now - self.period:
+            self.granted.popleft()
+        if len(self.granted) < self.rate:
+            return 0.0
+        return self.granted[0] + self.period - now
+
+    def record(self, now):
+        self.granted.append(now)
+
+
+class RateLimiter:
+    """Combine several sliding windows; a request waits until every window has room"""
+
+    def __init__(self, limits=JIKAN_LIMITS, clock=time.monotonic):
+        self.windows = [SlidingWindow(rate, period) for rate, period in limits]
+        self.clock = clock
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = self.clock()
+                wait = max(window.wait_time(now) for window in self.windows)
+                if wait <= 0:
+                    for window in self.windows:
+                        window.record(now)
+                    return
+                await asyncio.sleep(wait)
+
+
+def _status_error(response):
+    """ClientResponseError for a response that is not a 200"""
+    return aiohttp.ClientResponseError(
+        response.request_info, response.history,
+        status=response.status, message=response.reason or '', headers=response.headers
+    )
+
+
+class JikanClient:
+    """
+    Concurrent Jikan API client
+
+    Shares one pooled HTTP session, keeps requests under the API's per-second
+    and per-minute limits, and retries 429/5xx responses with exponential
+    backoff and jitter, honouring Retry-After when the server sends it.
+
+    Usage:
+        async with JikanClient() as client:
+            pages = await client.fetch_pages('/anime', {'order_by': 'popularity'}, range(1, 11))
+    """
+
+    def __init__(self, base_url=BASE_URL, limits=JIKAN_LIMITS, max_concurrency=3, max_retries=5,
+                 backoff_base=1.0, backoff_max=60.0, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.limiter = RateLimiter(limits)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._session = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+        self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._session.close()
+
+    def _backoff(self, attempt, retry_after=None):
+        """Seconds to wait before the next attempt"""
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        # Full jitter: uniform in [0, base * 2^attempt], capped
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def get_json(self, path, params=None):
+        """GET a JSON resource, retrying rate-limit and server errors"""
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        for attempt in range(self.max_retries + 1):
+            async with self._semaphore:
+                await self.limiter.acquire()
+                try:
+                    async with self._session.get(url, params=params) as response:
+                        if response.status == 200:
+                            return await response.json()
+                        # raise_for_status() only covers >= 400; a 204 or 304 is just as unusable
+                        if response.status not in RETRY_STATUSES or attempt == self.max_retries:
+                            raise _status_error(response)
+                        delay = self._backoff(attempt, response.headers.get('Retry-After'))
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                    if attempt == self.max_retries:
+                        raise
+                    delay = self._backoff(attempt)
+            # Sleep outside the semaphore so other requests can use the slot
+            await asyncio.sleep(delay)
+
+    async def fetch_pages(self, path, params, pages):
+        """
+        Fetch several pages of a listing concurrently
+
+        Returns:
+            List of (page, payload or exception) in page order
+        """
+        async def fetch(page):
+            try:
+                return page, await self.get_json(path, {**params, 'page': page})
+            except Exception as e:
+                return page, e
+
+        return await asyncio.gather(*(fetch(page) for page in pages))
+
+
+def fetch_pages(path, params, pages, **client_options):
+    """Synchronous wrapper around JikanClient.fetch_pages"""
+    async def run():
+        async with JikanClient(**client_options) as client:
+            return await client.fetch_pages(path, params, pages)
+
+    return asyncio.run(run())
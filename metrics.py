@@ -0,0 +1,191 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class NullMetrics:
+    """Metrics sink that records nothing; spans are a shared no-op context manager"""
+
+    enabled = False
+
+    def span(self, name, **labels):
+        return _NULL_SPAN
+
+    def increment(self, name, value=1, **labels):
+        pass
+
+    def gauge(self, name, value, **labels):
+        pass
+
+
+class _Span:
+    __slots__ = ('sink', 'name', 'labels', 'start')
+
+    def __init__(self, sink, name, labels):
+        self.sink = sink
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.sink.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class Metrics(NullMetrics):
+    """
+    Base class for recording sinks
+
+    Subclasses implement observe() (span durations in seconds), increment()
+    and gauge(); span() times a block and hands the duration to observe().
+    """
+
+    enabled = True
+
+    def span(self, name, **labels):
+        return _Span(self, name, labels)
+
+    def observe(self, name, seconds, **labels):
+        raise NotImplementedError
+
+
+class LoggingMetrics(Metrics):
+    """Write every span, counter and gauge to a logger"""
+
+    def __init__(self, logger=None, level=logging.INFO):
+        self.logger = logger or logging.getLogger('anime_recommender.metrics')
+        self.level = level
+
+    @staticmethod
+    def _labels(labels):
+        return ''.join(f' {k}={v}' for k, v in sorted(labels.items()))
+
+    def observe(self, name, seconds, **labels):
+        self.logger.log(self.level, "span %s %.3f ms%s", name, seconds * 1000, self._labels(labels))
+
+    def increment(self, name, value=1, **labels):
+        self.logger.log(self.level, "counter %s +%s%s", name, value, self._labels(labels))
+
+    def gauge(self, name, value, **labels):
+        self.logger.log(self.level, "gauge %s = %s%s", name, value, self._labels(labels))
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+class InMemoryMetrics(Metrics):
+    """
+    Thread-safe in-process registry
+
+    Keeps every span duration, so it suits tests and short-lived jobs;
+    snapshot() returns plain dicts keyed by (name, labels).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.timings = defaultdict(list)
+        self.counters = defaultdict(float)
+        self.gauges = {}
+
+    def observe(self, name, seconds, **labels):
+        with self._lock:
+            self.timings[_key(name, labels)].append(seconds)
+
+    def increment(self, name, value=1, **labels):
+        with self._lock:
+            self.counters[_key(name, labels)] += value
+
+    def gauge(self, name, value, **labels):
+        with self._lock:
+            self.gauges[_key(name, labels)] = value
+
+    def counter(self, name, **labels):
+        return self.counters.get(_key(name, labels), 0)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'timings': {key: list(values) for key, values in self.timings.items()},
+                'counters': dict(self.counters),
+                'gauges': dict(self.gauges),
+            }
+
+
+class PrometheusMetrics(Metrics):
+    """
+    Aggregating registry rendered in the Prometheus text exposition format
+
+    Spans become summaries (<name>_seconds_count / _sum), counters become
+    <name>_total and gauges are reported as-is, all under a common prefix.
+    """
+
+    def __init__(self, prefix='anime_recommender'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.summaries = defaultdict(lambda: [0, 0.0])
+        self.counters = defaultdict(float)
+        self.gauges = {}
+
+    def observe(self, name, seconds, **labels):
+        with self._lock:
+            summary = self.summaries[_key(name, labels)]
+            summary[0] += 1
+            summary[1] += seconds
+
+    def increment(self, name, value=1, **labels):
+        with self._lock:
+            self.counters[_key(name, labels)] += value
+
+    def gauge(self, name, value, **labels):
+        with self._lock:
+            self.gauges[_key(name, labels)] = value
+
+    @staticmethod
+    def _labels(labels):
+        if not labels:
+            return ''
+        escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in labels)
+        return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + '}'
+
+    @staticmethod
+    def _number(value):
+        return repr(float(value)) if isinstance(value, float) else str(value)
+
+    def render(self):
+        """Current values in the Prometheus text format"""
+        lines = []
+        with self._lock:
+            families = defaultdict(list)
+            for (name, labels), (count, total) in self.summaries.items():
+                families[(f'{self.prefix}_{name}_seconds', 'summary')].extend([
+                    f'{self.prefix}_{name}_seconds_count{self._labels(labels)} {count}',
+                    f'{self.prefix}_{name}_seconds_sum{self._labels(labels)} {self._number(total)}',
+                ])
+            for (name, labels), value in self.counters.items():
+                families[(f'{self.prefix}_{name}_total', 'counter')].append(
+                    f'{self.prefix}_{name}_total{self._labels(labels)} {self._number(value)}'
+                )
+            for (name, labels), value in self.gauges.items():
+                families[(f'{self.prefix}_{name}', 'gauge')].append(
+                    f'{self.prefix}_{name}{self._labels(labels)} {self._number(value)}'
+                )
+        for (family, kind), samples in sorted(families.items()):
+            lines.append(f'# TYPE {family} {kind}')
+            lines.extend(sorted(samples))
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,247 @@
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Bump whenever the on-disk layout changes so stale artifacts get rebuilt
+ARTIFACT_VERSION = 6
+MANIFEST_FILE = 'manifest.json'
+
+# Long text columns stored outside the pickled catalog and read by row offset
+TEXT_COLUMNS = ('synopsis', 'image_url')
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Content hash of a file, used to detect when the source CSV changes"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _atomic_write(path, write):
+    """
+    Write a file through a temporary name and rename it into place.
+
+    Readers that already memory-mapped the old file keep their pages, so a
+    rebuild never pulls data out from under a running worker.
+    """
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _save_array(artifact_dir, name, array):
+    _atomic_write(os.path.join(artifact_dir, f'{name}.npy'), lambda f: np.save(f, array))
+
+
+def _load_array(artifact_dir, name):
+    return np.load(os.path.join(artifact_dir, f'{name}.npy'), mmap_mode='r')
+
+
+def save_text_column(directory, name, values):
+    """Write a string column as one UTF-8 blob plus int64 row offsets (missing values are empty)"""
+    encoded = [value.encode('utf-8') if isinstance(value, str) else b'' for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    _atomic_write(os.path.join(directory, f'text_{name}.bin'), lambda f: f.writelines(encoded))
+    _save_array(directory, f'text_{name}_offsets', offsets)
+
+
+class TextColumn:
+    """
+    A string column kept on disk, read one row at a time
+
+    Only the row offsets are memory-mapped; strings are read from the blob
+    when asked for, so long text such as synopses never stays resident.
+    """
+
+    def __init__(self, directory, name):
+        self.path = os.path.join(directory, f'text_{name}.bin')
+        self.offsets = _load_array(directory, f'text_{name}_offsets')
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, pos):
+        return self.get([pos])[0]
+
+    def get(self, positions):
+        """Strings at the given row positions (None where missing)"""
+        values = []
+        with open(self.path, 'rb') as f:
+            for pos in positions:
+                start, end = int(self.offsets[pos]), int(self.offsets[pos + 1])
+                if start == end:
+                    values.append(None)
+                    continue
+                f.seek(start)
+                values.append(f.read(end - start).decode('utf-8'))
+        return values
+
+    def to_series(self):
+        """Read the whole column back as a Series"""
+        with open(self.path, 'rb') as f:
+            blob = f.read()
+        bounds = zip(self.offsets[:-1].tolist(), self.offsets[1:].tolist())
+        return pd.Series([blob[start:end].decode('utf-8') if end > start else np.nan for start, end in bounds])
+
+
+def read_manifest(artifact_dir):
+    """Return the artifact manifest, or None if there is no artifact"""
+    try:
+        with open(os.path.join(artifact_dir, MANIFEST_FILE), encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def is_current(manifest, source_hash, params):
+    """Check that an artifact was built from this source with these parameters"""
+    return (
+        manifest is not None
+        and manifest.get('version') == ARTIFACT_VERSION
+        and manifest.get('source_hash') == source_hash
+        and manifest.get('params') == params
+    )
+
+
+def save_artifact(artifact_dir, source_hash, params, catalog, feature_state, arrays, stats,
+                  text_sources=None, columns=None):
+    """
+    Persist a fitted model to artifact_dir
+
+    Args:
+        artifact_dir: Directory to write into (created if missing)
+        source_hash: Content hash of the source data
+        params: Model parameters the artifact was built with
+        catalog: Cleaned catalog DataFrame; its TEXT_COLUMNS are stored as text columns
+        feature_state: (metadata, arrays) from ContentFeatures.get_state()
+        arrays: Dict of name -> ndarray or sparse matrix to store
+        stats: JSON-serializable catalog statistics
+        text_sources: Dict of text column -> iterable of values aligned with the
+            catalog, for text columns that are not held in catalog
+        columns: Full column order of the catalog (default: catalog.columns)
+    """
+    os.makedirs(artifact_dir, exist_ok=True)
+
+    feature_meta, feature_arrays = feature_state
+    _atomic_write(
+        os.path.join(artifact_dir, 'features.json'),
+        lambda f: f.write(json.dumps(feature_meta).encode('utf-8'))
+    )
+    feature_names = sorted(feature_arrays)
+    for name in feature_names:
+        _save_array(artifact_dir, f'features_{name}', feature_arrays[name])
+    text_sources = dict(text_sources or {})
+    for name in TEXT_COLUMNS:
+        if name in catalog:
+            text_sources.setdefault(name, catalog[name])
+    for name, values in text_sources.items():
+        save_text_column(artifact_dir, name, values)
+    table = catalog.drop(columns=list(text_sources), errors='ignore')
+    _atomic_write(os.path.join(artifact_dir, 'catalog.pkl'), lambda f: table.to_pickle(f))
+    _atomic_write(
+        os.path.join(artifact_dir, 'stats.json'),
+        lambda f: f.write(json.dumps(stats).encode('utf-8'))
+    )
+
+    shapes = {}
+    for name, array in arrays.items():
+        if array is None:
+            continue
+        if sparse.issparse(array):
+            # Store CSR components separately so each can be memory-mapped
+            array = array.tocsr()
+            _save_array(artifact_dir, f'{name}_data', array.data)
+            _save_array(artifact_dir, f'{name}_indices', array.indices)
+            _save_array(artifact_dir, f'{name}_indptr', array.indptr)
+            shapes[name] = {'sparse': True, 'shape': list(array.shape)}
+        else:
+            _save_array(artifact_dir, name, array)
+            shapes[name] = {'sparse': False, 'shape': list(array.shape)}
+
+    # The manifest goes last: an artifact only counts once it is complete
+    manifest = {
+        'version': ARTIFACT_VERSION,
+        'source_hash': source_hash,
+        'params': params,
+        'arrays': shapes,
+        'feature_arrays': feature_names,
+        'columns': list(columns or catalog.columns),
+        'text_columns': list(text_sources),
+        'rows': len(catalog),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    _atomic_write(
+        os.path.join(artifact_dir, MANIFEST_FILE),
+        lambda f: f.write(json.dumps(manifest, indent=2).encode('utf-8'))
+    )
+    return manifest
+
+
+def load_artifact(artifact_dir, manifest, lazy_text=False):
+    """
+    Load a persisted model, memory-mapping every array
+
+    Args:
+        lazy_text: Leave the text columns on disk instead of adding them to the catalog
+
+    Returns:
+        (catalog, feature_state, arrays, stats, text_columns) where arrays maps
+        name -> ndarray or CSR matrix and text_columns maps name -> TextColumn
+        (empty unless lazy_text)
+    """
+    with open(os.path.join(artifact_dir, 'features.json'), encoding='utf-8') as f:
+        feature_meta = json.load(f)
+    feature_arrays = {name: _load_array(artifact_dir, f'features_{name}') for name in manifest['feature_arrays']}
+    catalog = pd.read_pickle(os.path.join(artifact_dir, 'catalog.pkl'))
+    text_columns = {name: TextColumn(artifact_dir, name) for name in manifest['text_columns']}
+    if not lazy_text:
+        for name, column in text_columns.items():
+            catalog[name] = column.to_series()
+        catalog = catalog[manifest['columns']]
+        text_columns = {}
+    with open(os.path.join(artifact_dir, 'stats.json'), encoding='utf-8') as f:
+        stats = json.load(f)
+
+    arrays = {}
+    for name, info in manifest['arrays'].items():
+        if info['sparse']:
+            arrays[name] = sparse.csr_matrix(
+                (
+                    _load_array(artifact_dir, f'{name}_data'),
+                    _load_array(artifact_dir, f'{name}_indices'),
+                    _load_array(artifact_dir, f'{name}_indptr'),
+                ),
+                shape=tuple(info['shape']),
+                copy=False
+            )
+        else:
+            arrays[name] = _load_array(artifact_dir, name)
+
+    return catalog, (feature_meta, feature_arrays), arrays, stats, text_columns
+
+
+if __name__ == "__main__":
+    from recommender import AnimeRecommender
+
+    data_path = sys.argv[1] if len(sys.argv) > 1 else 'anime.csv'
+    artifact_dir = sys.argv[2] if len(sys.argv) > 2 else 'model_artifact'
+    recommender = AnimeRecommender(data_path, artifact_dir=artifact_dir)
+    manifest = read_manifest(artifact_dir)
+    print(f"💾 Model artifact for {manifest['rows']} anime is up to date in {artifact_dir}/")
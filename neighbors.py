@@ -0,0 +1,220 @@
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy import sparse
+
+
+def top_k_per_row(sims, k):
+    """Return the k best (indices, scores) of each row of a dense block, best first"""
+    if k <= 0:
+        empty = np.empty((sims.shape[0], 0))
+        return empty.astype(np.int32), empty.astype(np.float32)
+    if k < sims.shape[1]:
+        # Sort the partition by column so ties resolve to the lower index
+        top = np.sort(np.argpartition(-sims, k - 1, axis=1)[:, :k], axis=1)
+    else:
+        top = np.tile(np.arange(sims.shape[1]), (sims.shape[0], 1))
+    top_scores = np.take_along_axis(sims, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    top = np.take_along_axis(top, order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+    return top.astype(np.int32), top_scores.astype(np.float32)
+
+
+def exact_neighbors(matrix, rows, k, matrix_t=None):
+    """
+    Exact top-k neighbors of the given rows against every row of matrix
+
+    matrix must have L2-normalized rows, so dot products are cosine similarities.
+    Each row is excluded from its own neighbors.
+    """
+    rows = np.asarray(rows, dtype=np.intp)
+    if matrix_t is None:
+        matrix_t = matrix.T.tocsr()
+    sims = (matrix[rows] @ matrix_t).toarray()
+    sims[np.arange(len(rows)), rows] = -np.inf
+    return top_k_per_row(sims, k)
+
+
+def build_exact_neighbors(matrix, k, block_size=256):
+    """Exact top-k neighbor table for every row, computed one block of rows at a time"""
+    n = matrix.shape[0]
+    indices = np.empty((n, k), dtype=np.int32)
+    scores = np.empty((n, k), dtype=np.float32)
+    matrix_t = matrix.T.tocsr()
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        indices[start:stop], scores[start:stop] = exact_neighbors(matrix, np.arange(start, stop), k, matrix_t)
+    return indices, scores
+
+
+# Per-process state of parallel build workers: (matrix, matrix_t, k)
+_worker_state = None
+
+
+def _save_csr(directory, name, matrix):
+    for part in ('data', 'indices', 'indptr'):
+        np.save(os.path.join(directory, f'{name}_{part}.npy'), getattr(matrix, part))
+
+
+def _load_csr(directory, name, shape):
+    parts = [np.load(os.path.join(directory, f'{name}_{part}.npy'), mmap_mode='r') for part in ('data', 'indices', 'indptr')]
+    return sparse.csr_matrix(tuple(parts), shape=shape, copy=False)
+
+
+def _init_worker(directory, shape, k):
+    """Memory-map the shared matrix once per worker process"""
+    global _worker_state
+    matrix = _load_csr(directory, 'matrix', shape)
+    matrix_t = _load_csr(directory, 'matrix_t', (shape[1], shape[0]))
+    _worker_state = (matrix, matrix_t, k)
+
+
+def _neighbors_block(bounds):
+    start, stop = bounds
+    matrix, matrix_t, k = _worker_state
+    indices, scores = exact_neighbors(matrix, np.arange(start, stop), k, matrix_t)
+    return start, indices, scores
+
+
+def build_exact_neighbors_parallel(matrix, k, block_size=256, n_jobs=None):
+    """
+    Exact top-k neighbor table computed across a process pool
+
+    The matrix and its transpose are written once to a temporary directory and
+    memory-mapped by every worker, so they are never pickled and all workers
+    share the same pages. Workers return one block of rows each, and results
+    are placed by block offset, so the output does not depend on scheduling.
+    Peak memory per worker is one (block_size x N) block of similarities.
+
+    Args:
+        n_jobs: Number of worker processes (None or -1 uses every core)
+    """
+    if n_jobs is None or n_jobs < 0:
+        n_jobs = os.cpu_count() or 1
+    n = matrix.shape[0]
+    matrix = matrix.tocsr()
+    indices = np.empty((n, k), dtype=np.int32)
+    scores = np.empty((n, k), dtype=np.float32)
+    blocks = [(start, min(start + block_size, n)) for start in range(0, n, block_size)]
+
+    with tempfile.TemporaryDirectory(prefix='anime-neighbors-') as directory:
+        _save_csr(directory, 'matrix', matrix)
+        _save_csr(directory, 'matrix_t', matrix.T.tocsr())
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                 initargs=(directory, matrix.shape, k)) as pool:
+            for start, block_indices, block_scores in pool.map(_neighbors_block, blocks):
+                indices[start:start + len(block_indices)] = block_indices
+                scores[start:start + len(block_scores)] = block_scores
+    return indices, scores
+
+
+def recall_at_k(approx_scores, exact_scores, tolerance=1e-6):
+    """
+    Mean recall@k of approximate neighbor lists against exact ones
+
+    Many titles share identical feature vectors, so ids are not compared
+    directly: an approximate neighbor counts as a hit when its score reaches
+    the exact k-th best score of its row.
+    """
+    approx_scores = np.asarray(approx_scores)
+    exact_scores = np.asarray(exact_scores)
+    if exact_scores.shape[1] == 0:
+        return 1.0
+    kth = exact_scores[:, -1:]
+    hits = (approx_scores >= kth - tolerance).sum(axis=1)
+    return float(np.minimum(hits, exact_scores.shape[1]).mean() / exact_scores.shape[1])
+
+
+class IVFIndex:
+    """
+    Approximate neighbor builder using an inverted-file (IVF) coarse quantizer
+
+    Rows are projected to n_components dimensions with TruncatedSVD and
+    clustered into n_lists cells with spherical k-means. Each cell's rows are
+    then compared exactly (on the full sparse vectors) only with the rows of
+    the n_probe cells nearest to it, so the build costs about
+    N * N * n_probe / n_lists instead of N^2.
+
+    Knobs:
+        n_components: SVD dimensions used for clustering (quality of the cells)
+        n_lists: Number of cells; defaults to sqrt(N)
+        n_probe: Cells scanned per query cell; higher means better recall, slower build
+        n_iter: k-means iterations
+    """
+
+    def __init__(self, n_components=64, n_lists=None, n_probe=8, n_iter=10, random_state=0):
+        self.n_components = n_components
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.random_state = random_state
+
+    def _reduce(self, matrix):
+        from sklearn.decomposition import TruncatedSVD
+        from sklearn.preprocessing import normalize
+
+        n_components = min(self.n_components, matrix.shape[1] - 1, matrix.shape[0] - 1)
+        if n_components < 1:
+            return normalize(matrix.toarray().astype(np.float32))
+        svd = TruncatedSVD(n_components=n_components, random_state=self.random_state)
+        return normalize(svd.fit_transform(matrix).astype(np.float32))
+
+    def _cluster(self, reduced, n_lists):
+        """Spherical k-means: returns (centroids, assignment of each row)"""
+        from sklearn.preprocessing import normalize
+
+        rng = np.random.default_rng(self.random_state)
+        centroids = reduced[rng.choice(len(reduced), n_lists, replace=False)]
+        assignment = np.zeros(len(reduced), dtype=np.intp)
+        for _ in range(self.n_iter):
+            assignment = np.argmax(reduced @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, reduced)
+            empty = ~sums.any(axis=1)
+            # Re-seed empty cells with random rows so every cell stays in use
+            sums[empty] = reduced[rng.choice(len(reduced), empty.sum())]
+            centroids = normalize(sums)
+        return centroids, np.argmax(reduced @ centroids.T, axis=1)
+
+    def build(self, matrix, k, block_size=256):
+        """
+        Approximate top-k neighbor table for every row of matrix
+
+        Returns:
+            (indices, scores) arrays of shape (N, k), best first
+        """
+        n = matrix.shape[0]
+        n_lists = self.n_lists or max(int(np.sqrt(n)), 1)
+        n_lists = min(n_lists, n)
+        centroids, assignment = self._cluster(self._reduce(matrix), n_lists)
+        cells = [np.flatnonzero(assignment == c) for c in range(n_lists)]
+        cell_order = np.argsort(-(centroids @ centroids.T), axis=1, kind='stable')
+
+        indices = np.empty((n, k), dtype=np.int32)
+        scores = np.empty((n, k), dtype=np.float32)
+        for c, members in enumerate(cells):
+            if len(members) == 0:
+                continue
+            # Probe the nearest cells, widening until there are enough candidates
+            probes = []
+            count = 0
+            for other in cell_order[c]:
+                probes.append(cells[other])
+                count += len(cells[other])
+                if len(probes) >= self.n_probe and count > k:
+                    break
+            candidates = np.sort(np.concatenate(probes))
+            candidates_t = matrix[candidates].T.tocsr()
+
+            for start in range(0, len(members), block_size):
+                block = members[start:start + block_size]
+                sims = (matrix[block] @ candidates_t).toarray()
+                # Exclude each row from its own neighbors
+                sims[np.arange(len(block)), np.searchsorted(candidates, block)] = -np.inf
+                top, top_scores = top_k_per_row(sims, k)
+                indices[block] = candidates[top]
+                scores[block] = top_scores
+        return indices, scores
@@ -0,0 +1,70 @@
+import os
+import sys
+
+import numpy as np
+
+RAILS_FILE = 'rails.npz'
+
+
+def precompute_rails(recommender, path=RAILS_FILE, top_n=20):
+    """
+    Precompute the top-N recommendations of every title into a columnar .npz
+
+    Columns:
+        anime_id: Sorted anime_ids of the catalog, shape (N,)
+        neighbor_ids: Recommended anime_ids per title, shape (N, top_n), best first
+        scores: Similarity scores, float32, shape (N, top_n)
+
+    Returns:
+        Number of titles written
+    """
+    catalog_ids = recommender.df['anime_id'].to_numpy(dtype=np.int64)
+    order = np.argsort(catalog_ids, kind='stable')
+    neighbor_ids, scores = recommender.get_recommendations_batch(catalog_ids[order].tolist(), top_n)
+
+    tmp_path = f'{path}.tmp.npz'
+    np.savez(tmp_path, anime_id=catalog_ids[order], neighbor_ids=neighbor_ids, scores=scores)
+    os.replace(tmp_path, path)
+    return len(order)
+
+
+class RailStore:
+    """
+    Serves precomputed "Because you liked X" rails
+
+    The rails file is loaded once; each lookup is a binary search over the
+    sorted anime_id column and a slice of the neighbor arrays, with no
+    DataFrame or model involved.
+    """
+
+    def __init__(self, path=RAILS_FILE):
+        with np.load(path) as rails:
+            self.anime_id = rails['anime_id']
+            self.neighbor_ids = rails['neighbor_ids']
+            self.scores = rails['scores']
+
+    def __len__(self):
+        return len(self.anime_id)
+
+    def get(self, anime_id, top_n=None):
+        """
+        Get the rail for one anime
+
+        Returns:
+            (neighbor_ids, scores) array views, or None if the anime has no rail
+        """
+        pos = np.searchsorted(self.anime_id, anime_id)
+        if pos >= len(self.anime_id) or self.anime_id[pos] != anime_id:
+            return None
+        return self.neighbor_ids[pos, :top_n], self.scores[pos, :top_n]
+
+
+if __name__ == "__main__":
+    from recommender import AnimeRecommender
+
+    data_path = sys.argv[1] if len(sys.argv) > 1 else 'anime.csv'
+    output = sys.argv[2] if len(sys.argv) > 2 else RAILS_FILE
+    top_n = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    recommender = AnimeRecommender(data_path, artifact_dir='model_artifact')
+    count = precompute_rails(recommender, output, top_n)
+    print(f"🚆 Precomputed top-{top_n} rails for {count} anime in {output}")
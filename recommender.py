@@ -1,82 +1,795 @@
+import itertools
+import os
+import tempfile
+
 import pandas as pd
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.preprocessing import MinMaxScaler
-import google.generativeai as genai
-import streamlit as st
+from scipy import sparse
+
+import catalog_index
+import catalog_loader
+import model_store
+from features import ContentFeatures
+from metrics import NullMetrics
+from neighbors import (
+    IVFIndex, build_exact_neighbors, build_exact_neighbors_parallel, exact_neighbors, recall_at_k, top_k_per_row
+)
+from response_cache import MemoryCache, make_cache_key
+
+
+def _clean_catalog(df):
+    """Drop unusable rows and normalize the score column"""
+    df = df.dropna(subset=['name', 'genres']).reset_index(drop=True)
+    df['score'] = pd.to_numeric(df['score'], errors='coerce').fillna(0)
+    return df
+
+
+def _arrow_string_dtype():
+    """Arrow-backed string dtype with NaN for missing values, or None without pyarrow"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return None
+    try:
+        return pd.StringDtype('pyarrow', na_value=np.nan)
+    except TypeError:
+        return 'string[pyarrow_numpy]'
+
+
+def _compact_catalog(df):
+    """Shrink catalog dtypes: categorical labels, 32-bit numerics and Arrow-backed strings"""
+    df = df.drop(columns=['features'], errors='ignore')
+    for column in ('type', 'genres'):
+        df[column] = df[column].astype('category')
+    for column in ('anime_id', 'members'):
+        if column in df and df[column].notna().all():
+            df[column] = df[column].astype(np.int32)
+        elif column in df:
+            df[column] = df[column].astype(np.float32)
+    for column in ('score', 'episodes'):
+        df[column] = df[column].astype(np.float32)
+    string_dtype = _arrow_string_dtype()
+    if string_dtype is not None:
+        for column in ('name', 'title_english', 'title_synonyms'):
+            if column in df:
+                df[column] = df[column].astype(string_dtype)
+    return df
+
+
+def _prefixed(arrays, prefix):
+    """The entries of arrays whose name starts with prefix, with the prefix removed"""
+    return {name[len(prefix):]: array for name, array in arrays.items() if name.startswith(prefix)}
+
 
 class AnimeRecommender:
-    def __init__(self, data_path='anime.csv'):
-        """Initialize recommender with anime data"""
-        self.df = pd.read_csv(data_path)
-        self.df = self.df.dropna(subset=['name', 'genres'])
-        self.df['score'] = pd.to_numeric(self.df['score'], errors='coerce').fillna(0)
+    GEMINI_MODEL = 'gemini-2.0-flash'
+    # Bump whenever the Gemini prompt changes so cached responses are not reused
+    PROMPT_VERSION = 1
+
+    def __init__(self, data_path='anime.csv', similarity_mode='neighbors', top_k=50, block_size=256,
+                 artifact_dir=None, response_cache=None, gemini_generator=None,
+                 feature_weights=None, chunk_size=10000, neighbor_backend='exact', ann_params=None,
+                 n_jobs=1, compact=False, sidecar='parquet', csv_engine=None, gemini_api_key=None,
+                 metrics=None):
+        """
+        Initialize recommender with anime data
+
+        Args:
+            data_path: Path to the anime CSV file
+            similarity_mode: 'neighbors' keeps only the top_k neighbors of each title
+                (O(N*K) memory); 'dense' keeps the full N x N similarity matrix
+            top_k: Number of neighbors stored per title in 'neighbors' mode
+            block_size: Rows per block when computing the neighbor index
+            artifact_dir: If set, load the fitted model from this directory and
+                (re)build it there only when the source CSV has changed
+            response_cache: Cache for Gemini responses (MemoryCache or SQLiteCache);
+                defaults to an in-memory LRU
+            gemini_generator: Callable mapping a prompt to response text; defaults to
+                the Gemini API (pass a fake to test without network access)
+            gemini_api_key: Gemini API key; defaults to the GEMINI_API_KEY environment
+                variable, then Streamlit secrets. Only read on the first Gemini call
+            feature_weights: Weights for the 'genres', 'type' and 'synopsis' feature
+                channels, e.g. {'genres': 1.0, 'type': 0.5, 'synopsis': 0.7}; None
+                keeps the original combined genres + type features
+            chunk_size: Rows per chunk when streaming synopses and other text columns
+            neighbor_backend: 'exact' compares every pair of titles; 'ann' builds the
+                neighbor index approximately with neighbors.IVFIndex (sub-quadratic,
+                for very large catalogs); check quality with evaluate_ann_recall()
+            ann_params: Keyword arguments for IVFIndex (n_components, n_lists, n_probe, ...)
+            n_jobs: Worker processes for the exact neighbor build (-1 uses every core)
+            compact: Keep a compact catalog for lower resident memory: categorical
+                type/genres, 32-bit numerics, Arrow-backed names (with pyarrow), no
+                build-only columns, and synopsis/image_url read from disk on demand
+            sidecar: Columnar copy of the CSV to load from ('parquet', 'feather' or
+                None); generated and refreshed automatically, needs pyarrow
+            csv_engine: pandas engine for parsing the CSV directly: 'c' (default)
+                or 'pyarrow'
+            metrics: Sink for timing spans, counters and gauges (see metrics.py);
+                defaults to metrics.NullMetrics, which records nothing
+        """
+        if similarity_mode not in ('neighbors', 'dense'):
+            raise ValueError(f"Unknown similarity_mode: {similarity_mode}")
+        if neighbor_backend not in ('exact', 'ann'):
+            raise ValueError(f"Unknown neighbor_backend: {neighbor_backend}")
+        self.similarity_mode = similarity_mode
+        self.top_k = top_k
+        self.block_size = block_size
+        self.neighbor_backend = neighbor_backend
+        self.ann_params = ann_params or {}
+        self.n_jobs = n_jobs
+        self.compact = compact
+        self.feature_weights = feature_weights
+        self.chunk_size = chunk_size
+        self.sidecar = sidecar
+        self.csv_engine = csv_engine
+        self.metrics = metrics if metrics is not None else NullMetrics()
+        # Text columns are streamed from here at build time while self.df still mirrors the file
+        self._text_source = data_path
+        self.content_features = None
+        self.tfidf_matrix = None
         self.similarity_matrix = None
-        self._build_model()
-        self._configure_gemini()
+        self.neighbor_indices = None
+        self.neighbor_scores = None
+        self.stats = None
+        self.name_index = {}
+        self.id_index = {}
+        self.search_index = None
+        self.genre_index = None
+        self.sort_index = None
+        self.leaderboards = None
+        self.score_prior = None
+        self.popularity_prior = None
+        # Full column order of the catalog, and (compact mode) text columns kept on disk
+        self._catalog_columns = []
+        self._text_columns = {}
+        self._text_dir = None
+        self.response_cache = response_cache if response_cache is not None else MemoryCache()
+        self._gemini_generator = gemini_generator
+        self._gemini_model = None
+        self._gemini_api_key = gemini_api_key
+        
+        source_hash = model_store.file_sha256(data_path) if artifact_dir else None
+        if not (artifact_dir and self._load_artifact(artifact_dir, source_hash)):
+            with self.metrics.span('load', source='csv'):
+                self._catalog_columns = catalog_loader.read_columns(data_path)
+                # Compact mode never holds the text columns, so they are not even parsed
+                columns = [c for c in self._catalog_columns if not (compact and c in model_store.TEXT_COLUMNS)]
+                self.df = _clean_catalog(catalog_loader.load_catalog(data_path, columns, sidecar, csv_engine))
+            self._build_model()
+            self.stats = catalog_index.CatalogStats.from_catalog(self.df)
+            self._build_search_indexes()
+            if artifact_dir:
+                self.save_artifact(artifact_dir, source_hash)
+            if compact:
+                self._compact(artifact_dir)
+        self._build_indexes()
+
+    def _build_indexes(self, changed=None):
+        """
+        Build the lookup structures over the loaded catalog
+
+        Args:
+            changed: Positions of rows updated or appended since the last build;
+                if given, sort orders and leaderboards are patched, not rebuilt
+        """
+        if changed is not None or self.search_index is None:
+            self._build_search_indexes()
+        self.name_index = catalog_index.build_name_index(self.df, self.search_index.normalized_names())
+        self.id_index = catalog_index.build_id_index(self.df)
+        if changed is not None and self.sort_index is not None:
+            self.sort_index.update(self.df, changed)
+            self.leaderboards.update(self.sort_index, self.genre_index, changed)
+        else:
+            self.sort_index = catalog_index.SortIndex(self.df)
+            self.leaderboards = catalog_index.Leaderboards(self.sort_index, self.genre_index)
+        # Re-ranking priors are computed on first use
+        self.score_prior = None
+        self.popularity_prior = None
+        self._record_sizes()
+    
+    def _build_search_indexes(self):
+        """Build the search and genre indexes, which the artifact persists"""
+        self.search_index = catalog_index.SearchIndex(self.df)
+        self.genre_index = catalog_index.GenreIndex(self.df)
+    
+    def _record_sizes(self):
+        """Report the size of the catalog, the feature matrix and the indexes as gauges"""
+        if not self.metrics.enabled:
+            return
+        gauge = self.metrics.gauge
+        gauge('catalog_rows', len(self.df))
+        if self.tfidf_matrix is not None:
+            gauge('tfidf_features', self.tfidf_matrix.shape[1])
+            gauge('tfidf_nnz', self.tfidf_matrix.nnz)
+        if self.similarity_matrix is not None:
+            gauge('similarity_bytes', self.similarity_matrix.nbytes)
+        if self.neighbor_indices is not None:
+            gauge('neighbor_index_bytes', self.neighbor_indices.nbytes + self.neighbor_scores.nbytes)
+        gauge('search_index_terms', len(self.search_index.grams) + len(self.search_index.genres))
+
+    def _build_priors(self):
+        """Precompute the [0, 1] score and log-members priors used for re-ranking"""
+        from sklearn.preprocessing import MinMaxScaler
+
+        scaler = MinMaxScaler()
+        score = pd.to_numeric(self.df['score'], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+        self.score_prior = scaler.fit_transform(score[:, np.newaxis]).ravel().astype(np.float32)
+        if 'members' in self.df:
+            members = pd.to_numeric(self.df['members'], errors='coerce').fillna(0).clip(lower=0).to_numpy()
+        else:
+            members = np.zeros(len(self.df))
+        self.popularity_prior = scaler.fit_transform(np.log1p(members)[:, np.newaxis]).ravel().astype(np.float32)
+
+    def find_anime(self, name_or_id):
+        """
+        Find the row position of an anime
+
+        Args:
+            name_or_id: anime_id, or a title (primary or alternative); titles are
+                matched ignoring case, Unicode width variants and extra whitespace
+
+        Returns:
+            Row position in self.df, or None if not found
+        """
+        if isinstance(name_or_id, (int, np.integer)):
+            return self.id_index.get(int(name_or_id))
+        if not isinstance(name_or_id, str):
+            return None
+        return self.name_index.get(catalog_index.normalize_name(name_or_id))
+
+    def _artifact_params(self):
+        """Parameters that must match for a persisted artifact to be reused"""
+        params = {'similarity_mode': self.similarity_mode, 'feature_weights': self.feature_weights}
+        if self.similarity_mode == 'neighbors':
+            params['top_k'] = self.top_k
+            params['neighbor_backend'] = self.neighbor_backend
+            if self.neighbor_backend == 'ann':
+                params['ann_params'] = self.ann_params
+        return params
+
+    def save_artifact(self, artifact_dir, source_hash):
+        """Write the fitted model to artifact_dir so later processes can skip fitting"""
+        text_sources = {
+            name: itertools.chain.from_iterable(self._text_chunks(name))
+            for name in model_store.TEXT_COLUMNS
+            if name in self._catalog_columns and name not in self.df
+        }
+        # 'features' is only the text the model was fitted on; loaded models never need it
+        catalog = self.df.drop(columns=['features'], errors='ignore')
+        columns = self._catalog_columns + [c for c in catalog.columns if c not in self._catalog_columns]
+        arrays = {
+            'tfidf': self.tfidf_matrix,
+            'similarity': self.similarity_matrix,
+            'neighbor_indices': self.neighbor_indices,
+            'neighbor_scores': self.neighbor_scores,
+        }
+        for prefix, index in (('search_index_', self.search_index), ('genre_index_', self.genre_index)):
+            arrays.update({prefix + name: array for name, array in index.get_state().items()})
+        model_store.save_artifact(
+            artifact_dir,
+            source_hash,
+            self._artifact_params(),
+            catalog,
+            self.content_features.get_state(),
+            arrays,
+            self.stats.to_dict(),
+            text_sources=text_sources,
+            columns=columns
+        )
+
+    def _load_artifact(self, artifact_dir, source_hash):
+        """Memory-map a persisted model; return False if it is missing or stale"""
+        manifest = model_store.read_manifest(artifact_dir)
+        if not model_store.is_current(manifest, source_hash, self._artifact_params()):
+            return False
+        
+        with self.metrics.span('load', source='artifact'):
+            self.df, feature_state, arrays, stats, self._text_columns = model_store.load_artifact(
+                artifact_dir, manifest, lazy_text=self.compact
+            )
+        self._catalog_columns = [c for c in manifest['columns'] if c != 'features']
+        if self.compact:
+            self.df = _compact_catalog(self.df)
+        self.stats = catalog_index.CatalogStats.from_dict(stats)
+        self.content_features = ContentFeatures.from_state(*feature_state)
+        self.tfidf_matrix = arrays['tfidf']
+        self.similarity_matrix = arrays.get('similarity')
+        self.neighbor_indices = arrays.get('neighbor_indices')
+        self.neighbor_scores = arrays.get('neighbor_scores')
+        # Search and genre indexes are memory-mapped too, not rebuilt
+        self.search_index = catalog_index.SearchIndex.from_state(_prefixed(arrays, 'search_index_'))
+        self.genre_index = catalog_index.GenreIndex.from_state(self.df, _prefixed(arrays, 'genre_index_'))
+        print("Recommendation model loaded from artifact!")
+        return True
+
+    def _compact(self, text_dir=None):
+        """
+        Switch self.df to the compact representation
+
+        Text columns are read from text_dir when they were already written
+        there (the artifact), otherwise they are written to a private
+        temporary directory first.
+        """
+        text_columns = [c for c in model_store.TEXT_COLUMNS if c in self._catalog_columns]
+        if text_dir is None:
+            text_dir = tempfile.TemporaryDirectory(prefix='anime-text-')
+            for name in text_columns:
+                values = itertools.chain.from_iterable(self._text_chunks(name))
+                model_store.save_text_column(text_dir.name, name, values)
+            self._text_dir, text_dir = text_dir, text_dir.name
+        self._text_columns = {name: model_store.TextColumn(text_dir, name) for name in text_columns}
+        self.df = _compact_catalog(self.df.drop(columns=text_columns, errors='ignore'))
+
+    def _expand(self):
+        """Undo _compact(): plain dtypes and every text column back in self.df"""
+        df = self.df.copy()
+        for column in df.columns:
+            if isinstance(df[column].dtype, pd.CategoricalDtype):
+                df[column] = df[column].astype(df[column].cat.categories.dtype)
+            elif df[column].dtype == np.int32:
+                df[column] = df[column].astype(np.int64)
+            elif df[column].dtype == np.float32:
+                df[column] = df[column].astype(np.float64)
+        for name, column in self._text_columns.items():
+            df[name] = column.to_series()
+        self.df = df[self._catalog_columns]
+        self._text_columns = {}
+
+    def get_text(self, positions, column='synopsis'):
+        """Values of a long text column (synopsis, image_url) for row positions, None where missing"""
+        if column in self._text_columns:
+            return self._text_columns[column].get(positions)
+        values = self.df[column].iloc[positions]
+        return [value if isinstance(value, str) else None for value in values]
 
-    def _configure_gemini(self):
-        """Configure the Gemini API."""
+    def get_synopsis(self, name_or_id):
+        """Synopsis of one anime, or None"""
+        pos = self.find_anime(name_or_id)
+        return None if pos is None else self.get_text([pos], 'synopsis')[0]
+
+    def _resolve_gemini_api_key(self):
+        """Gemini API key from the constructor, the environment or Streamlit secrets"""
+        if self._gemini_api_key:
+            return self._gemini_api_key
+        if os.environ.get('GEMINI_API_KEY'):
+            return os.environ['GEMINI_API_KEY']
         try:
-            genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
-        except Exception as e:
-            print(f"Error configuring Gemini: {e}")
+            import streamlit as st
+            return st.secrets["GEMINI_API_KEY"]
+        except Exception:
+            return None
 
     def _build_model(self):
         """Build content-based recommendation model"""
         # Create feature combining genres and type
-        self.df['features'] = self.df['genres'] + ' ' + self.df['type'].fillna('')
+        self.df['features'] = self._features(self.df)
         
-        # TF-IDF Vectorization
-        tfidf = TfidfVectorizer(stop_words='english')
-        tfidf_matrix = tfidf.fit_transform(self.df['features'])
+        # TF-IDF Vectorization (rows are L2-normalized, so dot product == cosine)
+        self.content_features = ContentFeatures(self.feature_weights)
+        synopsis_chunks = None
+        if 'synopsis' in self.content_features.channels:
+            synopsis_chunks = self._text_chunks('synopsis')
+        with self.metrics.span('vectorize'):
+            self.tfidf_matrix = self.content_features.fit_transform(self.df, synopsis_chunks)
         
         # Calculate cosine similarity
-        self.similarity_matrix = cosine_similarity(tfidf_matrix, tfidf_matrix)
+        with self.metrics.span('similarity_build', mode=self.similarity_mode):
+            if self.similarity_mode == 'dense':
+                from sklearn.metrics.pairwise import cosine_similarity
+
+                self.similarity_matrix = cosine_similarity(self.tfidf_matrix, self.tfidf_matrix)
+            else:
+                self._build_neighbor_index()
         print("Recommendation model built successfully!")
+
+    def _text_chunks(self, column):
+        """Yield a text column (e.g. synopsis) in chunks aligned with self.df's rows"""
+        if self._text_source is not None:
+            # Stream only the needed columns from disk, dropping rows the catalog drops
+            yield from catalog_loader.iter_column(self._text_source, column, self.chunk_size, self.sidecar)
+        elif column in self.df:
+            for start in range(0, len(self.df), self.chunk_size):
+                yield self.df[column].iloc[start:start + self.chunk_size]
+        else:
+            text = self._text_columns[column]
+            for start in range(0, len(text), self.chunk_size):
+                yield pd.Series(text.get(range(start, min(start + self.chunk_size, len(text)))))
+
+    @staticmethod
+    def _features(df):
+        """Text the TF-IDF model is fitted on"""
+        return df['genres'] + ' ' + df['type'].fillna('')
+
+    def _build_neighbor_index(self):
+        """Compute the top-K neighbors of every title, one block of rows at a time"""
+        n = self.tfidf_matrix.shape[0]
+        k = max(min(self.top_k, n - 1), 0)
+        if self.neighbor_backend == 'ann':
+            index = IVFIndex(**self.ann_params)
+            self.neighbor_indices, self.neighbor_scores = index.build(self.tfidf_matrix, k, self.block_size)
+        elif self.n_jobs != 1:
+            self.neighbor_indices, self.neighbor_scores = build_exact_neighbors_parallel(
+                self.tfidf_matrix, k, self.block_size, self.n_jobs
+            )
+        else:
+            self.neighbor_indices, self.neighbor_scores = build_exact_neighbors(self.tfidf_matrix, k, self.block_size)
+
+    def evaluate_ann_recall(self, sample_size=500, random_state=0):
+        """
+        Measure recall@K of the stored neighbor index against exact search
+
+        Exact neighbors are computed only for a random sample of titles.
+
+        Returns:
+            Dict with 'recall', 'k' and 'sample_size'
+        """
+        n, k = self.neighbor_indices.shape
+        rng = np.random.default_rng(random_state)
+        rows = np.sort(rng.choice(n, min(sample_size, n), replace=False))
+        _, exact_scores = exact_neighbors(self.tfidf_matrix, rows, k)
+        recall = recall_at_k(self.neighbor_scores[rows], exact_scores)
+        return {'recall': recall, 'k': k, 'sample_size': len(rows)}
+
+    def similar_indices(self, indices, top_n=10):
+        """
+        Get the top N most similar titles for a batch of row positions
+
+        Args:
+            indices: Row positions (a single int or a sequence)
+            top_n: Number of neighbors per query
+
+        Returns:
+            (neighbor_positions, scores), each of shape (len(indices), top_n), best first.
+            A query never appears in its own results, even when other titles tie with it.
+        """
+        indices = np.atleast_1d(np.asarray(indices, dtype=np.intp))
+        top_n = max(min(top_n, self.tfidf_matrix.shape[0] - 1), 0)
+        
+        if self.similarity_mode == 'neighbors':
+            if top_n <= self.neighbor_indices.shape[1]:
+                return self.neighbor_indices[indices, :top_n], self.neighbor_scores[indices, :top_n]
+            # Wider than the stored index: score these rows on the fly
+            sims = (self.tfidf_matrix[indices] @ self.tfidf_matrix.T).toarray()
+        else:
+            sims = np.array(self.similarity_matrix[indices])
+        
+        # Exclude each query by position rather than assuming it ranks first
+        sims[np.arange(len(indices)), indices] = -np.inf
+        return top_k_per_row(sims, top_n)
     
-    def get_recommendations(self, anime_name, top_n=10):
-        """Get top N similar anime recommendations"""
-        # Find anime index
-        try:
-            idx = self.df[self.df['name'].str.lower() == anime_name.lower()].index[0]
-        except:
-            return None
+    def add_anime(self, rows, drift_threshold=0.05):
+        """
+        Add or update a batch of anime without refitting the whole model
+
+        New rows are transformed with the fitted vocabulary, only their
+        neighbor lists are computed, and existing lists are patched with the
+        new candidates, so the cost is O(batch * N) rather than O(N^2). Rows
+        whose anime_id is already known replace the stored row. Existing lists
+        only consider their stored neighbors plus the batch, so a title whose
+        update lowers its similarity may leave a neighbor list slightly short
+        of the exact top-K until the next full build.
+
+        Args:
+            rows: DataFrame (or list of dicts) with catalog columns
+            drift_threshold: Refit everything when more than this fraction of the
+                batch's tokens is missing from the vocabulary
+
+        Returns:
+            Dict with 'inserted', 'updated' and 'refit'
+        """
+        if self.compact:
+            self._expand()
+        batch = _clean_catalog(pd.DataFrame(rows))
+        batch = batch.drop_duplicates(subset=['anime_id'], keep='last').reset_index(drop=True)
+        if 'features' in self.df:
+            batch['features'] = self._features(batch)
+        
+        positions = batch['anime_id'].map(lambda anime_id: self.id_index.get(int(anime_id)))
+        is_update = positions.notna().to_numpy()
+        updated = positions[is_update].astype(int).to_numpy()
+        n_old = len(self.df)
+        
+        # Catalog: overwrite updated rows in place, append new ones
+        df = self.df.copy()
+        for column in batch.columns.difference(df.columns, sort=False):
+            # Object dtype, so updated rows can be written into the new column
+            df[column] = pd.Series(None, index=df.index, dtype=object)
+        if is_update.any():
+            df.iloc[updated, df.columns.get_indexer(batch.columns)] = batch[is_update].to_numpy()
+        df = pd.concat([df, batch[~is_update]], ignore_index=True)
+        self.df = df
+        result = {'inserted': int((~is_update).sum()), 'updated': int(is_update.sum()), 'refit': False}
+        
+        # self.df no longer mirrors the source file, so refits read synopses from memory
+        self._text_source = None
+        if self.content_features.vocabulary_drift(batch) > drift_threshold:
+            self._build_model()
+            result['refit'] = True
+        else:
+            self._patch_model(n_old, updated, batch, is_update)
+        
+        self.stats = catalog_index.CatalogStats.from_catalog(self.df)
+        self._catalog_columns = [c for c in self.df.columns if c != 'features']
+        if self.compact:
+            self._compact()
+        self._build_indexes(changed=np.concatenate([updated, np.arange(n_old, len(self.df))]))
+        return result
+
+    def _patch_model(self, n_old, updated, batch, is_update):
+        """Update the TF-IDF rows and neighbor structures for a batch of changed rows"""
+        batch_matrix = self.content_features.transform(batch)
+        
+        # Row order of the new matrix: old rows, with updated rows taken from the batch
+        order = np.arange(n_old)
+        order[updated] = n_old + np.flatnonzero(is_update)
+        order = np.concatenate([order, n_old + np.flatnonzero(~is_update)])
+        self.tfidf_matrix = sparse.vstack([self.tfidf_matrix, batch_matrix]).tocsr()[order]
+        
+        n = self.tfidf_matrix.shape[0]
+        changed = np.concatenate([updated, np.arange(n_old, n)]).astype(np.intp)
+        # Similarity of every title to each changed row: (N, B)
+        changed_sims = (self.tfidf_matrix @ self.tfidf_matrix[changed].T).toarray()
+        
+        if self.similarity_mode == 'dense':
+            dense = np.zeros((n, n), dtype=self.similarity_matrix.dtype)
+            dense[:n_old, :n_old] = self.similarity_matrix
+            dense[:, changed] = changed_sims
+            dense[changed, :] = changed_sims.T
+            self.similarity_matrix = dense
+            return
+        
+        k = max(min(self.top_k, n - 1), 0)
+        old_k = self.neighbor_indices.shape[1]
+        old_indices = np.zeros((n_old, k), dtype=np.int32)
+        old_scores = np.full((n_old, k), -np.inf, dtype=np.float32)
+        old_indices[:, :min(old_k, k)] = self.neighbor_indices[:, :k]
+        old_scores[:, :min(old_k, k)] = self.neighbor_scores[:, :k]
+        # Stored scores of changed rows are stale; they come back fresh from changed_sims
+        old_scores[np.isin(old_indices, changed)] = -np.inf
+        
+        indices = np.empty((n, k), dtype=np.int32)
+        scores = np.empty((n, k), dtype=np.float32)
+        indices[:n_old] = old_indices
+        scores[:n_old] = old_scores
+        
+        # Existing rows: merge stored neighbors with the changed rows as candidates
+        for start in range(0, n_old, self.block_size):
+            stop = min(start + self.block_size, n_old)
+            block_sims = changed_sims[start:stop].copy()
+            rows = np.arange(start, stop)
+            block_sims[rows[:, None] == changed[None, :]] = -np.inf
+            cand_idx = np.hstack([old_indices[start:stop], np.broadcast_to(changed, block_sims.shape)])
+            cand_scores = np.hstack([old_scores[start:stop], block_sims])
+            top, top_scores = top_k_per_row(cand_scores, k)
+            indices[start:stop] = np.take_along_axis(cand_idx, top, axis=1)
+            scores[start:stop] = top_scores
+        
+        # Changed rows: full neighbor lists against the whole catalog
+        matrix_t = self.tfidf_matrix.T.tocsr()
+        for start in range(0, len(changed), self.block_size):
+            block = changed[start:start + self.block_size]
+            indices[block], scores[block] = exact_neighbors(self.tfidf_matrix, block, k, matrix_t)
+        
+        self.neighbor_indices = indices
+        self.neighbor_scores = scores
+
+    def rerank(self, candidates, sim_scores, top_n=10, score_weight=0.0, popularity_weight=0.0, diversity=0.0):
+        """
+        Re-rank retrieved candidates with quality priors and optional diversity
+
+        Each candidate's relevance is its similarity plus score_weight times its
+        min-max normalized score plus popularity_weight times its normalized
+        log(members). With diversity > 0, titles are picked greedily by maximal
+        marginal relevance: (1 - diversity) * relevance - diversity * (highest
+        similarity to an already picked title).
+
+        Args:
+            candidates: Candidate row positions
+            sim_scores: Their similarity to the query
+            top_n: Number of titles to keep
+
+        Returns:
+            (positions, sim_scores) of the kept candidates, in ranked order
+        """
+        candidates = np.asarray(candidates, dtype=np.intp)
+        sim_scores = np.asarray(sim_scores, dtype=np.float32)
+        if self.score_prior is None:
+            self._build_priors()
+        relevance = sim_scores + score_weight * self.score_prior[candidates] \
+            + popularity_weight * self.popularity_prior[candidates]
+        top_n = min(top_n, len(candidates))
         
-        # Get similarity scores
-        sim_scores = list(enumerate(self.similarity_matrix[idx]))
-        sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)
-        sim_scores = sim_scores[1:top_n+1]  # Exclude itself
+        if diversity <= 0:
+            order = np.argsort(-relevance, kind='stable')[:top_n]
+            return candidates[order], sim_scores[order]
         
-        # Get anime indices
-        anime_indices = [i[0] for i in sim_scores]
+        features = self.tfidf_matrix[candidates]
+        pairwise = (features @ features.T).toarray()
+        redundancy = np.full(len(candidates), -np.inf, dtype=np.float32)
+        available = np.ones(len(candidates), dtype=bool)
+        order = []
+        for _ in range(top_n):
+            mmr = (1 - diversity) * relevance - diversity * np.maximum(redundancy, 0)
+            mmr[~available] = -np.inf
+            pick = int(np.argmax(mmr))
+            order.append(pick)
+            available[pick] = False
+            redundancy = np.maximum(redundancy, pairwise[pick])
+        return candidates[order], sim_scores[order]
+    
+    def recommend_positions(self, anime_name, top_n=10, score_weight=0.0, popularity_weight=0.0,
+                            diversity=0.0, candidate_pool=50):
+        """
+        Row positions and similarity scores of the top N recommendations for a title
+
+        Takes the same arguments as get_recommendations() but skips building a
+        DataFrame. Returns (positions, scores), or None if the title is not found.
+        """
+        with self.metrics.span('lookup'):
+            return self._recommend_positions(
+                anime_name, top_n, score_weight, popularity_weight, diversity, candidate_pool
+            )
+    
+    def _recommend_positions(self, anime_name, top_n, score_weight, popularity_weight, diversity,
+                             candidate_pool):
+        idx = self.find_anime(anime_name)
+        if idx is None:
+            self.metrics.increment('lookup_not_found')
+            return None
+        
+        # Get the most similar anime, re-ranking a wider candidate pool if asked to
+        reranking = score_weight or popularity_weight or diversity
+        pool = top_n
+        if reranking:
+            pool = max(top_n, candidate_pool)
+            if self.similarity_mode == 'neighbors':
+                # Stay within the stored neighbor table so no similarities are recomputed
+                pool = max(top_n, min(pool, self.neighbor_indices.shape[1]))
+        anime_indices, sim_scores = self.similar_indices(idx, pool)
+        anime_indices, sim_scores = anime_indices[0], sim_scores[0]
+        if reranking:
+            anime_indices, sim_scores = self.rerank(
+                anime_indices, sim_scores, top_n, score_weight, popularity_weight, diversity
+            )
+        return anime_indices, sim_scores
+    
+    def get_recommendations(self, anime_name, top_n=10, score_weight=0.0, popularity_weight=0.0,
+                            diversity=0.0, candidate_pool=50):
+        """
+        Get top N similar anime recommendations
+
+        Args:
+            anime_name: Title or anime_id
+            top_n: Number of recommendations
+            score_weight: Weight of the normalized score prior (0 = similarity only)
+            popularity_weight: Weight of the normalized log-members prior
+            diversity: MMR trade-off in [0, 1]; 0 keeps pure relevance order
+            candidate_pool: Candidates retrieved for re-ranking when any weight is set
+        """
+        result = self.recommend_positions(
+            anime_name, top_n, score_weight, popularity_weight, diversity, candidate_pool
+        )
+        if result is None:
+            return None
+        anime_indices, sim_scores = result
         
         # Return recommendations with similarity scores
         recommendations = self.df.iloc[anime_indices].copy()
-        recommendations['similarity_score'] = [i[1] for i in sim_scores]
+        recommendations['similarity_score'] = sim_scores
         
         return recommendations[['name', 'genres', 'score', 'episodes', 'type', 'similarity_score']]
     
-    def get_gemini_recommendations(self, anime_name):
+    def _seed_weights(self, seeds):
+        """Resolve a list of titles/ids or a {title or id: weight} dict to (positions, weights)"""
+        if seeds is None:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+        items = seeds.items() if isinstance(seeds, dict) else ((seed, 1.0) for seed in seeds)
+        weights = {}
+        for seed, weight in items:
+            pos = self.find_anime(seed)
+            if pos is not None:
+                weights[pos] = weights.get(pos, 0.0) + float(weight)
+        return np.fromiter(weights, dtype=np.intp), np.fromiter(weights.values(), dtype=np.float32)
+    
+    def get_profile_recommendations(self, liked, disliked=None, top_n=10):
         """
-        Generates anime recommendations using the Gemini API with detailed information.
+        Get top N anime for a taste profile built from several titles
+
+        The profile is the weighted centroid of the liked titles' feature rows
+        minus that of the disliked ones; the whole catalog is scored against it
+        with one sparse matrix-vector product.
+
+        Args:
+            liked: Titles or anime_ids, or a dict of title/anime_id -> weight
+            disliked: Same form as liked; pushes similar titles down
+            top_n: Number of recommendations
+
+        Returns:
+            DataFrame like get_recommendations(), or None if no liked title is found
         """
-        import time
+        liked_positions, liked_weights = self._seed_weights(liked)
+        disliked_positions, disliked_weights = self._seed_weights(disliked)
+        if len(liked_positions) == 0:
+            return None
         
-        try:
-            model = genai.GenerativeModel('gemini-2.0-flash')
-            
-            # Get anime info from database if available
-            anime_info = self.df[self.df['name'].str.lower() == anime_name.lower()]
-            if len(anime_info) > 0:
-                genres = anime_info.iloc[0]['genres']
-                anime_type = anime_info.iloc[0]['type']
-                context = f"The user likes '{anime_name}' which is a {anime_type} anime with genres: {genres}."
-            else:
-                context = f"The user is interested in the anime '{anime_name}'."
-            
-            prompt = f"""
+        positions = np.concatenate([liked_positions, disliked_positions])
+        weights = np.concatenate([liked_weights, -disliked_weights])
+        from sklearn.preprocessing import normalize
+
+        profile = normalize(sparse.csr_matrix(weights[np.newaxis, :]) @ self.tfidf_matrix[positions])
+        
+        # Score every title against the profile and exclude the seeds
+        sims = (self.tfidf_matrix @ profile.T).toarray().ravel()
+        sims[positions] = -np.inf
+        top_n = max(min(top_n, len(sims) - len(np.unique(positions))), 0)
+        anime_indices, sim_scores = top_k_per_row(sims[np.newaxis, :], top_n)
+        
+        recommendations = self.df.iloc[anime_indices[0]].copy()
+        recommendations['similarity_score'] = sim_scores[0]
+        
+        return recommendations[['name', 'genres', 'score', 'episodes', 'type', 'similarity_score']]
+    
+    def get_recommendations_batch(self, ids_or_names, top_n=10):
+        """
+        Get top N similar anime for many titles at once, as arrays
+
+        Args:
+            ids_or_names: Sequence of anime_ids and/or titles
+            top_n: Number of recommendations per title
+
+        Returns:
+            (anime_ids, scores) arrays of shape (len(ids_or_names), top_n), best first.
+            Rows for titles that are not found hold anime_id -1 and score NaN.
+        """
+        with self.metrics.span('lookup_batch'):
+            return self._recommendations_batch(ids_or_names, top_n)
+    
+    def _recommendations_batch(self, ids_or_names, top_n):
+        positions = [self.find_anime(key) for key in ids_or_names]
+        positions = np.array([-1 if pos is None else pos for pos in positions], dtype=np.intp)
+        top_n = max(min(top_n, len(self.df) - 1), 0)
+        anime_ids = np.full((len(positions), top_n), -1, dtype=np.int64)
+        scores = np.full((len(positions), top_n), np.nan, dtype=np.float32)
+        catalog_ids = self.df['anime_id'].to_numpy(dtype=np.int64)
+        
+        found = np.flatnonzero(positions >= 0)
+        for start in range(0, len(found), self.block_size):
+            rows = found[start:start + self.block_size]
+            neighbor_positions, neighbor_scores = self.similar_indices(positions[rows], top_n)
+            anime_ids[rows] = catalog_ids[neighbor_positions]
+            scores[rows] = neighbor_scores
+        
+        return anime_ids, scores
+    
+    def _generate(self, prompt):
+        """Send a prompt to Gemini, reusing one model client for the recommender's lifetime"""
+        if self._gemini_generator is not None:
+            return self._gemini_generator(prompt)
+        if self._gemini_model is None:
+            import google.generativeai as genai
+
+            api_key = self._resolve_gemini_api_key()
+            if not api_key:
+                raise RuntimeError(
+                    "No Gemini API key: pass gemini_api_key, set GEMINI_API_KEY "
+                    "or add it to .streamlit/secrets.toml"
+                )
+            genai.configure(api_key=api_key)
+            self._gemini_model = genai.GenerativeModel(self.GEMINI_MODEL)
+        return self._gemini_model.generate_content(prompt).text
+
+    def _gemini_prompt(self, anime_name):
+        """Build the Gemini prompt for an anime"""
+        # Get anime info from database if available
+        idx = self.find_anime(anime_name)
+        if idx is not None:
+            genres = self.df.iloc[idx]['genres']
+            anime_type = self.df.iloc[idx]['type']
+            context = f"The user likes '{anime_name}' which is a {anime_type} anime with genres: {genres}."
+        else:
+            context = f"The user is interested in the anime '{anime_name}'."
+        
+        return f"""
             {context}
             
             Recommend 5 similar anime that the user would enjoy. For each recommendation, provide:
@@ -99,14 +812,36 @@ class AnimeRecommender:
             
             Make the recommendations diverse but thematically similar. Focus on quality anime with good ratings.
             """
+
+    def get_gemini_recommendations(self, anime_name):
+        """
+        Generates anime recommendations using the Gemini API with detailed information.
+
+        Successful responses are cached by normalized title, model and prompt
+        version, so repeat requests are served without an API call.
+        """
+        import time
+        
+        try:
+            key = make_cache_key(catalog_index.normalize_name(anime_name), self.GEMINI_MODEL, self.PROMPT_VERSION)
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                self.metrics.increment('gemini_cache_hits')
+                return cached
+            self.metrics.increment('gemini_cache_misses')
+            
+            prompt = self._gemini_prompt(anime_name)
             
             # Add retry logic for rate limiting
             max_retries = 2
             for attempt in range(max_retries):
                 try:
-                    response = model.generate_content(prompt)
-                    return response.text
+                    with self.metrics.span('gemini'):
+                        text = self._generate(prompt)
+                    self.response_cache.set(key, text)
+                    return text
                 except Exception as e:
+                    self.metrics.increment('gemini_errors')
                     error_str = str(e)
                     if "429" in error_str or "rate limit" in error_str.lower():
                         if attempt < max_retries - 1:
@@ -117,36 +852,116 @@ class AnimeRecommender:
         except Exception as e:
             return f"An error occurred: {e}"
 
-    def search_anime(self, query):
-        """Search anime by name or genre"""
+    def search_anime(self, query, limit=None):
+        """
+        Search anime by name or genre
+
+        Matches are plain substrings (never regexes), ranked by match quality
+        and popularity. limit caps the number of rows returned.
+        """
         if not query:
-            return self.df
+            return self.df if limit is None else self.df.head(limit)
         
-        query = query.lower()
-        mask = (
-            self.df['name'].str.lower().str.contains(query, na=False) |
-            self.df['genres'].str.lower().str.contains(query, na=False)
-        )
-        return self.df[mask]
+        return self.df.iloc[self.search_positions(query, limit)]
+    
+    def search_positions(self, query, limit=None):
+        """Row positions matching a search query, best match first"""
+        with self.metrics.span('search'):
+            return self.search_index.search(query, limit)
+    
+    def query_anime(self, genres=None, match='all', types=None, min_score=None, max_score=None,
+                    min_episodes=None, max_episodes=None, positions=None):
+        """
+        Filter the catalog with vectorized masks and return matching row positions
+
+        See catalog_index.GenreIndex.query for the arguments. Genres are matched
+        as whole genre names, so 'Sci' does not match 'Sci-Fi'.
+        """
+        with self.metrics.span('filter'):
+            return self.genre_index.query(
+                genres=genres, match=match, types=types,
+                min_score=min_score, max_score=max_score,
+                min_episodes=min_episodes, max_episodes=max_episodes,
+                positions=positions
+            )
+    
+    def sort_positions(self, positions, by='score', ascending=False):
+        """Order row positions by a catalog column"""
+        positions = np.asarray(positions, dtype=np.intp)
+        return positions[catalog_index.sort_order(self.df[by].to_numpy()[positions], ascending)]
+    
+    def sorted_window(self, positions=None, by='score', ascending=None, offset=0, limit=None):
+        """
+        Page through rows in sort order using the precomputed sort permutations
+
+        Args:
+            positions: Rows to page through (e.g. from search_positions() or
+                query_anime()); None pages through the whole catalog
+            by: Sort column; 'score', 'members' and 'name' are precomputed
+            ascending: Sort direction; None sorts numbers high to low and text A-Z
+            offset: Rows to skip
+            limit: Rows in the window (None = all remaining rows)
+
+        Returns:
+            (positions in the window, total number of rows being paged through)
+        """
+        if ascending is None:
+            ascending = not pd.api.types.is_numeric_dtype(self.df[by])
+        return self.sort_index.window(positions, by, ascending, offset, limit)
+    
+    def get_page(self, positions=None, by='score', ascending=None, offset=0, limit=100, columns=None):
+        """Rows of one sorted page and the total row count (see sorted_window())"""
+        window, total = self.sorted_window(positions, by, ascending, offset, limit)
+        return self.get_rows(window, columns or self._catalog_columns), total
+    
+    def iter_csv(self, positions=None, by='score', ascending=None, columns=None, chunk_size=None):
+        """
+        Stream rows as CSV text in sort order, header first
+
+        Nothing is sorted or serialized until the generator is consumed, and
+        only chunk_size rows are materialized at a time.
+        """
+        columns = columns or self._catalog_columns
+        chunk_size = chunk_size or self.chunk_size
+        order, _ = self.sorted_window(positions, by, ascending)
+        yield pd.DataFrame(columns=columns).to_csv(index=False)
+        for start in range(0, len(order), chunk_size):
+            yield self.get_rows(order[start:start + chunk_size], columns).to_csv(index=False, header=False)
+    
+    def get_rows(self, positions, columns=None):
+        """Materialize only the requested columns for the given row positions"""
+        if columns is None:
+            if not self._text_columns:
+                return self.df.iloc[positions]
+            columns = self._catalog_columns
+        lazy = [c for c in columns if c in self._text_columns]
+        if not lazy:
+            return self.df.iloc[positions, self.df.columns.get_indexer(columns)]
+        
+        # Compact mode: read text columns from disk for just these rows
+        rows = self.df.iloc[positions, self.df.columns.get_indexer([c for c in columns if c not in lazy])]
+        for column in lazy:
+            rows[column] = self.get_text(positions, column)
+        return rows[columns]
     
     def filter_anime(self, genre=None, min_score=0, max_episodes=None, anime_type=None):
         """Filter anime by criteria"""
-        filtered = self.df.copy()
-        
-        if genre:
-            filtered = filtered[filtered['genres'].str.contains(genre, case=False, na=False)]
-        if min_score > 0:
-            filtered = filtered[filtered['score'] >= min_score]
-        if max_episodes:
-            filtered = filtered[filtered['episodes'] <= max_episodes]
-        if anime_type:
-            filtered = filtered[filtered['type'] == anime_type]
-        
-        return filtered.sort_values('score', ascending=False)
-    
-    def get_top_anime(self, n=10):
-        """Get top rated anime"""
-        return self.df.nlargest(n, 'score')[['name', 'score', 'genres', 'episodes', 'type']]
+        positions = self.query_anime(
+            genres=genre or None,
+            types=anime_type or None,
+            min_score=min_score if min_score > 0 else None,
+            max_episodes=max_episodes or None
+        )
+        return self.df.iloc[self.sort_positions(positions, 'score')]
+    
+    def top_positions(self, n=10, genre=None, anime_type=None):
+        """Row positions of the n best-scored anime, optionally within a genre and/or type"""
+        return self.leaderboards.top(n, genre, anime_type)
+    
+    def get_top_anime(self, n=10, genre=None, anime_type=None):
+        """Get top rated anime (e.g. get_top_anime(30, 'Action', 'TV'))"""
+        positions = self.top_positions(n, genre, anime_type)
+        return self.df.iloc[positions, self.df.columns.get_indexer(['name', 'score', 'genres', 'episodes', 'type'])]
     
     def get_all_anime_names(self):
         """Get list of all anime names for autocomplete"""
@@ -0,0 +1,407 @@
+"""
+Headless HTTP API for the recommender
+
+Usage:
+    python server.py [--data anime.csv] [--artifact-dir model_artifact] [--port 8000]
+                     [--workers 2] [--threads 8] [--queue-size 64] [--metrics]
+
+Endpoints (JSON responses):
+    GET  /health
+    GET  /recommend?title=Naruto&n=10      (or id=20; optional score_weight,
+                                            popularity_weight, diversity)
+    GET  /recommend/batch?id=20&id=1735&n=10
+    POST /recommend/batch                  {"titles": ["Naruto", 1735], "n": 10}
+    GET  /search?q=naruto&limit=10
+    GET  /filter?genre=Action&type=TV&min_score=8&max_episodes=26&offset=0&limit=20
+    GET  /top?n=10&genre=Action&type=TV
+    GET  /metrics                          (with --metrics; Prometheus text format)
+
+The parent process makes sure the model artifact is current, binds the
+socket and pre-forks the workers. Each worker memory-maps the shared artifact
+once and serves requests from a fixed thread pool fed by a bounded queue;
+connections arriving while the queue is full get 503 straight away instead
+of piling up.
+
+With --metrics every worker keeps its own metrics.PrometheusMetrics
+registry (request, lookup, search and filter spans plus index sizes), so a
+scrape of /metrics reports the worker that happened to accept it.
+"""
+import argparse
+import json
+import os
+import queue
+import signal
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from metrics import PrometheusMetrics
+from recommender import AnimeRecommender
+
+RECORD_COLUMNS = ('anime_id', 'name', 'score', 'genres', 'type', 'episodes', 'members')
+MAX_RESULTS = 100
+MAX_BATCH = 1000
+MATCH_MODES = ('all', 'any')
+
+
+def encode_json(payload):
+    """Compact UTF-8 JSON: no whitespace, no ASCII escaping"""
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False, allow_nan=False).encode('utf-8')
+
+
+def _plain(value):
+    """JSON-safe Python value for a catalog cell"""
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float):
+        if value != value:
+            return None
+        return int(value) if value.is_integer() else round(value, 4)
+    return value
+
+
+class BadRequest(ValueError):
+    pass
+
+
+class RecommendationService:
+    """
+    Endpoint logic over a loaded AnimeRecommender
+
+    Catalog columns are converted to JSON-ready Python lists once, so a
+    response is built from row positions without touching the DataFrame.
+    """
+
+    def __init__(self, recommender):
+        self.recommender = recommender
+        df = recommender.df
+        self.columns = {c: [_plain(v) for v in df[c].tolist()] for c in RECORD_COLUMNS if c in df}
+
+    def records(self, positions, scores=None):
+        records = []
+        for i, pos in enumerate(np.asarray(positions).tolist()):
+            record = {c: values[pos] for c, values in self.columns.items()}
+            if scores is not None:
+                record['similarity'] = round(float(scores[i]), 4)
+            records.append(record)
+        return records
+
+    def health(self, params, body):
+        return {'status': 'ok', 'anime': len(self.recommender.df)}
+
+    def recommend(self, params, body):
+        key = _anime_key(params)
+        result = self.recommender.recommend_positions(
+            key,
+            _int(params, 'n', 10, 0, MAX_RESULTS),
+            score_weight=_float(params, 'score_weight', 0.0),
+            popularity_weight=_float(params, 'popularity_weight', 0.0),
+            diversity=_float(params, 'diversity', 0.0)
+        )
+        if result is None:
+            return 404, {'error': f'anime not found: {key}'}
+        positions, scores = result
+        return {'query': key, 'recommendations': self.records(positions, scores)}
+
+    def recommend_batch(self, params, body):
+        if body is not None:
+            keys = body.get('titles') or body.get('ids') or []
+            n = body.get('n', 10)
+            # bool is an int subclass, but a JSON true is not a count
+            if not isinstance(keys, list) or isinstance(n, bool) or not isinstance(n, int):
+                raise BadRequest("expected {\"titles\": [...], \"n\": int}")
+            n = min(max(n, 0), MAX_RESULTS)
+        else:
+            try:
+                keys = [int(v) for v in params.get('id', [])] + params.get('title', [])
+            except ValueError:
+                raise BadRequest("id must be an integer")
+            n = _int(params, 'n', 10, 0, MAX_RESULTS)
+        if len(keys) > MAX_BATCH:
+            raise BadRequest(f"at most {MAX_BATCH} titles per batch")
+        anime_ids, scores = self.recommender.get_recommendations_batch(keys, n)
+        results = []
+        for key, ids, row_scores in zip(keys, anime_ids.tolist(), scores.tolist()):
+            found = not ids or ids[0] != -1
+            results.append({
+                'query': key,
+                'anime_ids': ids if found else None,
+                'scores': [round(s, 4) for s in row_scores] if found else None,
+            })
+        return {'results': results}
+
+    def search(self, params, body):
+        query = _str(params, 'q')
+        if not query:
+            raise BadRequest("missing q")
+        positions = self.recommender.search_positions(query, _int(params, 'limit', 10, 1, MAX_RESULTS))
+        return {'query': query, 'results': self.records(positions)}
+
+    def filter(self, params, body):
+        match = _str(params, 'match') or 'all'
+        if match not in MATCH_MODES:
+            raise BadRequest(f"match must be one of: {', '.join(MATCH_MODES)}")
+        positions = self.recommender.query_anime(
+            genres=params.get('genre') or None,
+            match=match,
+            types=params.get('type') or None,
+            min_score=_float(params, 'min_score'),
+            max_score=_float(params, 'max_score'),
+            min_episodes=_float(params, 'min_episodes'),
+            max_episodes=_float(params, 'max_episodes')
+        )
+        offset = _int(params, 'offset', 0, 0, None)
+        limit = _int(params, 'limit', 20, 1, MAX_RESULTS)
+        window, total = self.recommender.sorted_window(positions, 'score', offset=offset, limit=limit)
+        return {'total': total, 'offset': offset, 'results': self.records(window)}
+
+    def top(self, params, body):
+        positions = self.recommender.top_positions(
+            _int(params, 'n', 10, 1, MAX_RESULTS), _str(params, 'genre'), _str(params, 'type')
+        )
+        return {'results': self.records(positions)}
+
+    def metrics(self, params, body):
+        sink = self.recommender.metrics
+        if not hasattr(sink, 'render'):
+            return 404, {'error': 'metrics are disabled (start the server with --metrics)'}
+        return 200, sink.render()
+
+
+def _str(params, name):
+    values = params.get(name)
+    return values[0] if values else None
+
+
+def _int(params, name, default, low, high):
+    value = _str(params, name)
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise BadRequest(f"{name} must be an integer")
+    value = max(value, low)
+    return value if high is None else min(value, high)
+
+
+def _float(params, name, default=None):
+    value = _str(params, name)
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        raise BadRequest(f"{name} must be a number")
+
+
+def _anime_key(params):
+    if _str(params, 'id'):
+        try:
+            return int(_str(params, 'id'))
+        except ValueError:
+            raise BadRequest("id must be an integer")
+    if _str(params, 'title'):
+        return _str(params, 'title')
+    raise BadRequest("missing title or id")
+
+
+ROUTES = {
+    ('GET', '/health'): 'health',
+    ('GET', '/recommend'): 'recommend',
+    ('GET', '/recommend/batch'): 'recommend_batch',
+    ('POST', '/recommend/batch'): 'recommend_batch',
+    ('GET', '/search'): 'search',
+    ('GET', '/filter'): 'filter',
+    ('GET', '/top'): 'top',
+    ('GET', '/metrics'): 'metrics',
+}
+
+
+class RecommendationHandler(BaseHTTPRequestHandler):
+    server_version = 'AnimeRecommender/1.0'
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def _dispatch(self, method):
+        url = urlsplit(self.path)
+        route = ROUTES.get((method, url.path.rstrip('/') or '/'))
+        if route is None:
+            return self._send(404, {'error': 'not found'})
+        try:
+            body = None
+            if method == 'POST':
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length) or b'{}')
+                if not isinstance(body, dict):
+                    raise BadRequest("expected a JSON object")
+            service = self.server.service
+            with service.recommender.metrics.span('request', route=route):
+                result = getattr(service, route)(parse_qs(url.query), body)
+        except (BadRequest, json.JSONDecodeError) as e:
+            return self._send(400, {'error': str(e)})
+        except Exception as e:
+            self.log_error("%s failed: %r", self.path, e)
+            return self._send(500, {'error': 'internal error'})
+        status, payload = result if isinstance(result, tuple) else (200, result)
+        self._send(status, payload)
+
+    def _send(self, status, payload):
+        if isinstance(payload, str):
+            data, content_type = payload.encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8'
+        else:
+            data, content_type = encode_json(payload), 'application/json; charset=utf-8'
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class BoundedThreadPoolServer(HTTPServer):
+    """
+    HTTPServer with a fixed pool of handler threads fed by a bounded queue
+
+    Accepted connections wait in the queue for a free thread; when
+    queue_size connections are already waiting, new ones get an immediate
+    503 with Retry-After instead of an unbounded backlog.
+    """
+
+    REJECT_BODY = encode_json({'error': 'server busy, retry later'})
+    # Listen backlog; overload is shed by the queue with a 503, not by the kernel
+    request_queue_size = 256
+
+    def __init__(self, address, handler=RecommendationHandler, threads=8, queue_size=64, verbose=False):
+        super().__init__(address, handler)
+        self.threads = threads
+        self.pending = queue.Queue(queue_size)
+        self.verbose = verbose
+        self.service = None
+
+    def start_workers(self):
+        """Start the handler threads (in the serving process, after any fork)"""
+        for _ in range(self.threads):
+            threading.Thread(target=self._work, daemon=True).start()
+
+    def process_request(self, request, client_address):
+        try:
+            self.pending.put_nowait((request, client_address))
+        except queue.Full:
+            self._reject(request)
+
+    def _reject(self, request):
+        try:
+            request.sendall(
+                b'HTTP/1.0 503 Service Unavailable\r\n'
+                b'Content-Type: application/json; charset=utf-8\r\n'
+                b'Retry-After: 1\r\n'
+                + f'Content-Length: {len(self.REJECT_BODY)}\r\n\r\n'.encode('ascii')
+                + self.REJECT_BODY
+            )
+        except OSError:
+            pass
+        finally:
+            self.shutdown_request(request)
+
+    def _work(self):
+        while True:
+            request, client_address = self.pending.get()
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+
+def load_recommender(recommender_options):
+    """AnimeRecommender for the options, with a Prometheus registry if 'metrics' is set"""
+    options = dict(recommender_options)
+    if options.pop('metrics', False):
+        options['metrics'] = PrometheusMetrics()
+    return AnimeRecommender(**options)
+
+
+def serve_worker(server, recommender_options, recommender=None):
+    """Load the model from the shared artifact (unless given one) and serve until interrupted"""
+    if recommender is None:
+        recommender = load_recommender(recommender_options)
+    server.service = RecommendationService(recommender)
+    server.start_workers()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default='anime.csv')
+    parser.add_argument('--artifact-dir', default='model_artifact')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--queue-size', type=int, default=64)
+    parser.add_argument('--compact', action='store_true', help='Load the compact catalog in every worker')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    parser.add_argument('--metrics', action='store_true', help='Serve per-worker Prometheus metrics at /metrics')
+    args = parser.parse_args()
+
+    options = {'data_path': args.data, 'artifact_dir': args.artifact_dir, 'compact': args.compact}
+    single_process = args.workers <= 1 or not hasattr(os, 'fork')
+    if single_process:
+        # The one instance that refreshes the artifact also serves
+        recommender = load_recommender(dict(options, metrics=args.metrics))
+    else:
+        # Build or refresh the shared artifact once, before any worker loads it
+        AnimeRecommender(**options)
+    options['metrics'] = args.metrics
+
+    server = BoundedThreadPoolServer(
+        (args.host, args.port), threads=args.threads, queue_size=args.queue_size, verbose=args.verbose
+    )
+    workers = 1 if single_process else args.workers
+    print(f"🚀 Serving on http://{args.host}:{server.server_port} with {workers} worker(s)")
+    if single_process:
+        serve_worker(server, options, recommender)
+        return
+
+    children = []
+    for _ in range(args.workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            serve_worker(server, options)
+            os._exit(0)
+        children.append(pid)
+
+    def stop(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        for pid in children:
+            os.waitpid(pid, 0)
+    except KeyboardInterrupt:
+        stop(None, None)
+    server.server_close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())